@@ -1,114 +1,29 @@
-import os
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from datetime import datetime, timedelta
-
-# Google Analytics Data API v1beta 사용
-SCOPES = [
-    'https://www.googleapis.com/auth/analytics.readonly',
-    'https://www.googleapis.com/auth/spreadsheets'
-]
-
-CLIENT_SECRET_FILE = os.getenv("GA_CLIENT_SECRET_PATH", "./client_secret.json")
-TOKEN_FILE = os.getenv("GA_TOKEN_PATH", "./ga_token.json")
+import argparse
+import re
+import time
+import cassette
+import report_cache
+import run_metrics
+import shard
+from daily_store import get_cumulative_clicks, plan_daily_report
+from ga_client import get_sheets_service
+from ga_executor import DEFAULT_CONCURRENCY, run_reports_concurrently
+from ga_reports import START_DATE, click_report_body, fetch_clicks, iter_report_rows, sum_event_counts
+from keyword_matcher import MATCH_MODES, KeywordMatcher, parse_mode
+from sheet_snapshot import SheetSnapshot, column_index
+from sheet_writer import SheetWriteBuffer
 
 PROPERTY_ID = "464149233"
 SEARCH_TERMS_SHEET_ID = "1vxP7tVII0oWaGtro8puSXy7lDvYDrnppaRPv2qFACm0"
 
 
-def get_credentials():
-    creds = None
-
-    # 토큰 파일이 존재하면 로드
-    if os.path.exists(TOKEN_FILE):
-        try:
-            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-            print("기존 토큰 파일에서 인증 정보를 로드했습니다.")
-        except Exception as e:
-            print(f"토큰 파일 로드 중 오류: {e}")
-            if os.path.exists(TOKEN_FILE):
-                os.remove(TOKEN_FILE)
-                print("손상된 토큰 파일을 삭제했습니다.")
-
-    # 토큰이 없거나 유효하지 않은 경우
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            try:
-                print("토큰이 만료되었습니다. 갱신을 시도합니다...")
-                creds.refresh(Request())
-                print("토큰 갱신이 완료되었습니다.")
-                
-                # 갱신된 토큰을 다시 저장
-                with open(TOKEN_FILE, 'w') as token:
-                    token.write(creds.to_json())
-                print(f"갱신된 토큰이 {TOKEN_FILE}에 저장되었습니다.")
-                
-            except Exception as e:
-                print(f"토큰 갱신 실패: {e}")
-                if os.path.exists(TOKEN_FILE):
-                    os.remove(TOKEN_FILE)
-                    print("만료된 토큰 파일을 삭제했습니다.")
-                
-                # CI 환경 체크
-                if os.getenv("GITHUB_ACTIONS") == "true":
-                    raise RuntimeError(
-                        "GA_TOKEN_JSON secret 업데이트 필요: 토큰 갱신에 실패했습니다."
-                    )
-                
-                flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
-                creds = flow.run_local_server(port=0)
-                print("새로운 인증이 완료되었습니다.")
-        else:
-            print("새로운 인증을 시작합니다...")
-
-            if os.getenv("GITHUB_ACTIONS") == "true":
-                raise RuntimeError(
-                    "GA_TOKEN_JSON secret 필요: Actions에서는 브라우저 인증(InstalledAppFlow)을 사용할 수 없습니다."
-                )
-
-            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-            print("인증이 완료되었습니다.")
-
-        # 토큰 저장
-        try:
-            with open(TOKEN_FILE, 'w') as token:
-                token.write(creds.to_json())
-            print(f"토큰이 {TOKEN_FILE}에 저장되었습니다.")
-        except Exception as e:
-            print(f"토큰 저장 중 오류: {e}")
-
-    return creds
-
-
-def get_search_terms_from_sheet():
-    creds = get_credentials()
-    sheets_service = build('sheets', 'v4', credentials=creds)
-
-    result = sheets_service.spreadsheets().values().get(
-        spreadsheetId=SEARCH_TERMS_SHEET_ID,
-        range="B:B"
-    ).execute()
-
-    values = result.get('values', [])
-    search_terms = []
-
-    for i, row in enumerate(values):
-        if i == 0:
-            continue
-        if row and row[0].strip():
-            search_terms.append(row[0].strip())
-
+def get_search_terms_from_sheet(snapshot):
+    search_terms = snapshot.terms()
     print(f"구글 시트에서 {len(search_terms)}개의 검색어를 가져왔습니다.")
     return search_terms
 
 
-def get_analytics_data_for_search_term(search_term, start_date, end_date):
-    creds = get_credentials()
-    analytics = build('analyticsdata', 'v1beta', credentials=creds)
-
+def search_term_report_body(search_term, start_date, end_date):
     filter_value = search_term
     match_type = "EXACT"
 
@@ -146,91 +61,188 @@ def get_analytics_data_for_search_term(search_term, start_date, end_date):
                     }
                 ]
             }
-        },
-        "limit": 1000
+        }
     }
+    return request_body
+
+
+def get_analytics_data_for_search_term(search_term, start_date, end_date):
+    """검색어 하나의 클릭 수 합계. 응답 행은 페이지 단위로 받아 바로 합산하고, 실패하면 None."""
+    request_body = search_term_report_body(search_term, start_date, end_date)
 
     try:
-        response = analytics.properties().runReport(
-            property=f"properties/{PROPERTY_ID}",
-            body=request_body
-        ).execute()
-        return response
+        return sum_event_counts(iter_report_rows(PROPERTY_ID, request_body))
     except Exception as e:
         print(f"검색어 '{search_term}'에 대한 데이터 조회 중 오류: {e}")
         return None
 
 
-def find_today_column(sheets_service):
-    result = sheets_service.spreadsheets().values().get(
-        spreadsheetId=SEARCH_TERMS_SHEET_ID,
-        range="1:1"
-    ).execute()
+def get_clicks_by_source(search_terms, start_date, end_date):
+    """
+    모든 검색어의 클릭 수를 sessionSource 기준으로 한 번에 조회.
+    검색어마다 runReport를 보내지 않고, inListFilter로 묶어서 한 리포트로 받은 뒤
+    소문자 sessionSource → 클릭 수 딕셔너리로 합산해서 반환.
+    (GA의 EXACT stringFilter가 대소문자를 구분하지 않으므로 동일하게 소문자로 합산)
+    search_terms가 None이면 필터 없이 모든 sessionSource를 받는다 (keyword_matcher용).
+    """
+    clicks_by_source = fetch_clicks(PROPERTY_ID, "sessionSource", start_date, end_date, values=search_terms)
+    print(f"sessionSource {len(clicks_by_source)}개의 클릭 수를 한 번에 조회했습니다.")
+    return clicks_by_source
+
+
+def get_clicks_per_term(search_terms, start_date, end_date, concurrency):
+    """
+    검색어마다 runReport를 보내야 할 때: ga_executor로 동시에 조회해서
+    (소문자 검색어 → 클릭 수, 조회 실패한 검색어 집합)을 반환.
+    """
+    results = run_reports_concurrently(
+        PROPERTY_ID,
+        search_terms,
+        lambda search_term: search_term_report_body(search_term, start_date, end_date),
+        max_workers=concurrency
+    )
+
+    clicks_by_term = {}
+    failed_terms = set()
+    for search_term, total_clicks in zip(search_terms, results):
+        if total_clicks is None:
+            failed_terms.add(search_term)
+            continue
+        clicks_by_term[search_term.lower()] = total_clicks
+    return clicks_by_term, failed_terms
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="검색어(sessionSource)별 누적 클릭 수를 시트에 기록")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="로컬 일자별 저장소를 전체 기간으로 다시 받아 맞춤")
+    parser.add_argument("--no-incremental", action="store_true",
+                        help="로컬 저장소 없이 전체 기간을 GA에서 직접 조회")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="GA 리포트 로컬 캐시를 사용하지 않음")
+    parser.add_argument("--per-term", action="store_true",
+                        help="검색어마다 runReport를 동시에 보내서 조회 (로컬 저장소/일괄 조회 미사용)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"--per-term 동시 요청 수 (기본 {DEFAULT_CONCURRENCY})")
+    add_match_arguments(parser)
+    parser.add_argument("--shard", type=shard_argument, metavar="i/N",
+                        help="검색어를 안정 해시로 N개로 나눈 것 중 i번째(1부터)만 조회하고 시트 대신 결과 파일에 저장")
+    parser.add_argument("--shard-out", help="--shard 결과 파일 경로 (기본 shard_results/source_iofN.json)")
+    parser.add_argument("--profile", type=int, nargs="?", const=10, metavar="N",
+                        help="종료 시 가장 느린 GA/시트 호출 N개 출력 (기본 10)")
+    cassette.add_arguments(parser)
+    args = parser.parse_args(argv)
+    check_match_arguments(parser, args)
+    if args.per_term and uses_matcher(args.match_mode, args.match_column):
+        parser.error("--per-term은 EXACT 조회만 하므로 --match-mode / --match-column과 함께 쓸 수 없습니다.")
+    if args.shard_out and not args.shard:
+        parser.error("--shard-out은 --shard와 함께 써야 합니다.")
+    if args.shard and not args.shard_out:
+        args.shard_out = f"shard_results/source_{args.shard[0]}of{args.shard[1]}.json"
+    return args
+
+
+def shard_argument(text):
+    try:
+        return shard.parse_shard(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
 
-    values = result.get('values', [[]])
-    if not values or not values[0]:
-        print("헤더 행을 찾을 수 없습니다.")
-        return None
 
-    today = datetime.now().strftime("%Y-%m-%d")
-    today_short = datetime.now().strftime("%m/%d")
-    today_dot = datetime.now().strftime("%Y.%m.%d")
-    date_formats = [today, today_short, today_dot]
+def add_match_arguments(parser):
+    parser.add_argument("--match-mode", choices=MATCH_MODES, default="exact",
+                        help="검색어 매칭 방식 (기본 exact) - " + ", ".join(MATCH_MODES))
+    parser.add_argument("--match-column",
+                        help="행마다 매칭 방식을 적어 둔 열 문자 (B열 오른쪽, 빈 셀은 --match-mode)")
 
-    for i, cell in enumerate(values[0]):
-        if cell:
-            cell_str = str(cell).strip()
-            for date_format in date_formats:
-                if date_format in cell_str:
-                    col_letter = chr(65 + i) if i < 26 else chr(64 + i // 26) + chr(65 + i % 26)
-                    print(f"오늘 날짜 열 발견: {col_letter}1 ({cell_str})")
-                    return col_letter
 
-    print(f"오늘 날짜({today})에 해당하는 열을 찾을 수 없습니다.")
-    return None
+def check_match_arguments(parser, args):
+    if args.match_column:
+        args.match_column = args.match_column.strip().upper()
+        if not args.match_column.isalpha() or column_index(args.match_column) <= column_index("B"):
+            parser.error(f"--match-column은 B열 오른쪽 열 문자여야 합니다: {args.match_column}")
 
 
-def update_single_cell(sheets_service, search_term, click_count, today_column, row_number):
-    try:
-        cell_range = f"{today_column}{row_number}"
-        sheets_service.spreadsheets().values().update(
-            spreadsheetId=SEARCH_TERMS_SHEET_ID,
-            range=cell_range,
-            valueInputOption='USER_ENTERED',
-            body={'values': [[click_count]]}
-        ).execute()
-        print(f"✓ '{search_term}': {click_count} → {cell_range}")
-        return True
-    except Exception as e:
-        print(f"✗ '{search_term}' 기록 실패: {e}")
-        return False
+def uses_matcher(match_mode, match_column):
+    """기존 EXACT 조회 대신 sessionSource 전체를 받아 keyword_matcher로 매칭하는지."""
+    return bool(match_column) or match_mode != "exact"
 
 
-def main():
-    # 2025년 2월 1일부터 오늘까지 누적 데이터 수집
-    start_date = "2025-02-01"
-    end_date = datetime.now().strftime("%Y-%m-%d")
-
-    print(f"Google Analytics 데이터 수집: {start_date} ~ {end_date}")
+def snapshot_range(match_column=None, last_column="B"):
+    """B열부터 last_column과 매칭 방식 열까지 담는 스냅샷 범위."""
+    if match_column and column_index(match_column) > column_index(last_column):
+        last_column = match_column
+    return f"B:{last_column}"
 
-    creds = get_credentials()
-    sheets_service = build('sheets', 'v4', credentials=creds)
 
-    today_column = find_today_column(sheets_service)
-    if not today_column:
-        print("오늘 날짜 열을 찾을 수 없어 업데이트를 중단합니다.")
-        return
-
-    search_terms = get_search_terms_from_sheet()
+def plan_reports(snapshot, start_date, end_date, incremental=True, per_term=False, full_rebuild=False,
+                 match_mode="exact", match_column=None, shard_spec=None):
+    """collect_search_term_clicks가 같은 옵션으로 보낼 runReport 목록 [(property_id, body)] (report_planner용)."""
+    search_terms = shard.select(snapshot.terms(), shard_spec)
+    if not search_terms:
+        return []
+    if per_term:
+        return [(PROPERTY_ID, search_term_report_body(term, start_date, end_date)) for term in search_terms]
+    if not incremental:
+        values = None if uses_matcher(match_mode, match_column) else search_terms
+        return [(PROPERTY_ID, click_report_body("sessionSource", start_date, end_date, values=values))]
+    body = plan_daily_report(PROPERTY_ID, "sessionSource", end_date, full_rebuild=full_rebuild)
+    return [(PROPERTY_ID, body)] if body else []
+
+
+def match_search_terms(snapshot, search_terms, clicks_by_source, match_mode="exact", match_column=None):
+    """
+    keyword_matcher로 행마다 클릭 수를 계산해서 ([(검색어, 방식, 행 번호, 클릭 수)], 실패한 행 수)를 반환.
+    행의 매칭 방식은 match_column 셀(비어 있으면 match_mode)이고, 같은 (검색어, 방식)은 한 번만 계산한다.
+    """
+    started = time.perf_counter()
+    matcher = KeywordMatcher(clicks_by_source)
+    resolved = {}
+    results = []
+    failed_count = 0
+    for search_term in search_terms:
+        for row_number in snapshot.rows_for(search_term):
+            mode = match_mode
+            if match_column:
+                mode = parse_mode(snapshot.cell(row_number, match_column), default=match_mode)
+            if mode is None:
+                print(f"✗ '{search_term}' ({match_column}{row_number}): 알 수 없는 매칭 방식 "
+                      f"'{snapshot.cell(row_number, match_column)}' (가능한 값: {', '.join(MATCH_MODES)})")
+                failed_count += 1
+                continue
+            if (search_term, mode) not in resolved:
+                try:
+                    resolved[(search_term, mode)] = matcher.clicks(search_term, mode)
+                except re.error as e:
+                    resolved[(search_term, mode)] = None
+                    print(f"✗ '{search_term}': 잘못된 정규식 ({e})")
+            if resolved[(search_term, mode)] is None:
+                failed_count += 1
+                continue
+            results.append((search_term, mode, row_number, resolved[(search_term, mode)]))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"sessionSource {len(clicks_by_source)}개로 검색어 {len(resolved)}건 매칭 ({elapsed_ms:.1f}ms)")
+    return results, failed_count
+
+
+def collect_search_term_clicks(snapshot, today_column, writer, start_date, end_date,
+                                incremental=True, per_term=False, full_rebuild=False,
+                                concurrency=DEFAULT_CONCURRENCY, match_mode="exact", match_column=None,
+                                shard_spec=None):
+    """
+    스냅샷의 B열 검색어마다 누적 클릭 수를 계산해서 writer에 today_column 셀로 추가.
+    조회에 실패한 검색어 수를 반환 (조회 자체가 실패하면 예외).
+    match_mode가 exact가 아니거나 match_column이 있으면 keyword_matcher로 행마다 매칭한다
+    (match_column은 스냅샷 열 범위 안에 있어야 함).
+    shard_spec=(i, N)이면 그 샤드에 속하는 검색어만 처리한다.
+    """
+    search_terms = get_search_terms_from_sheet(snapshot)
     if not search_terms:
         print("검색어를 가져올 수 없습니다.")
-        return
-
-    result = sheets_service.spreadsheets().values().get(
-        spreadsheetId=SEARCH_TERMS_SHEET_ID,
-        range="B:B"
-    ).execute()
-    values = result.get('values', [])
+        return 0
+    if shard_spec:
+        search_terms = shard.select(search_terms, shard_spec)
+        print(f"샤드 {shard_spec[0]}/{shard_spec[1]}: 검색어 {len(search_terms)}개를 처리합니다.")
 
     additional_values = {
         'sellerocean': 6,
@@ -241,41 +253,109 @@ def main():
         'salecafe': 6
     }
 
+    failed_terms = set()
+    if per_term:
+        clicks_by_source, failed_terms = get_clicks_per_term(
+            search_terms, start_date, end_date, concurrency
+        )
+    elif not incremental:
+        values = None if uses_matcher(match_mode, match_column) else search_terms
+        clicks_by_source = get_clicks_by_source(values, start_date, end_date)
+    else:
+        clicks_by_source = get_cumulative_clicks(
+            PROPERTY_ID, "sessionSource", end_date, full_rebuild=full_rebuild
+        )
+
     print("\n=== 검색어별 클릭 이벤트 수 ===")
     print("검색어\t\t클릭 이벤트 수")
     print("-" * 40)
 
-    success_count = 0
-    fail_count = 0
-
-    for i, search_term in enumerate(search_terms):
-        print(f"'{search_term}' 조회 중...")
-        response = get_analytics_data_for_search_term(search_term, start_date, end_date)
+    if uses_matcher(match_mode, match_column):
+        matched, failed_count = match_search_terms(
+            snapshot, search_terms, clicks_by_source, match_mode=match_mode, match_column=match_column
+        )
+        printed = set()
+        for search_term, mode, row_number, total_clicks in matched:
+            total_clicks += additional_values.get(search_term, 0)
+            if (search_term, mode) not in printed:
+                printed.add((search_term, mode))
+                print(f"{search_term} [{mode}]\t\t{total_clicks}")
+            writer.add(search_term, today_column, row_number, total_clicks)
+        return failed_count
+
+    for search_term in search_terms:
+        if search_term in failed_terms:
+            # 조회에 실패한 검색어는 0으로 덮어쓰지 않고 실패로 집계
+            continue
 
-        if response and 'rows' in response:
-            total_clicks = 0
-            for row in response['rows']:
-                clicks = int(row['metricValues'][0]['value'])
-                total_clicks += clicks
-        else:
-            total_clicks = 0
+        total_clicks = clicks_by_source.get(search_term.lower(), 0)
 
         if search_term in additional_values:
             total_clicks += additional_values[search_term]
 
         print(f"{search_term}\t\t{total_clicks}")
 
-        actual_row_number = None
-        for row_idx, row in enumerate(values):
-            if row and row[0].strip() == search_term:
-                actual_row_number = row_idx + 1
-                break
-
-        if actual_row_number:
-            if update_single_cell(sheets_service, search_term, total_clicks, today_column, actual_row_number):
-                success_count += 1
-            else:
-                fail_count += 1
+        for row_number in snapshot.rows_for(search_term):
+            writer.add(search_term, today_column, row_number, total_clicks)
+
+    return len(failed_terms)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    job_name = f"source_{args.shard[0]}of{args.shard[1]}" if args.shard else "source"
+    run_metrics.install(job_name, profile_top=args.profile)
+    cassette.from_args(args)
+    if args.no_cache:
+        report_cache.set_enabled(False)
+
+    # 2025년 2월 1일부터 오늘까지 누적 데이터 수집
+    start_date = START_DATE
+    end_date = cassette.now().strftime("%Y-%m-%d")
+
+    print(f"Google Analytics 데이터 수집: {start_date} ~ {end_date}")
+
+    sheets_service = get_sheets_service()
+
+    # 헤더 행 + B열(--match-column이 있으면 그 열까지)을 한 번에 읽어 둔 스냅샷으로 날짜 열/검색어/행 번호를 모두 처리
+    snapshot = SheetSnapshot.load(sheets_service, SEARCH_TERMS_SHEET_ID, snapshot_range(args.match_column))
+
+    today_column = snapshot.find_today_column()
+    if not today_column:
+        print("오늘 날짜 열을 찾을 수 없어 업데이트를 중단합니다.")
+        return
+
+    writer = SheetWriteBuffer(sheets_service, SEARCH_TERMS_SHEET_ID)
+    if not args.shard:
+        # 오늘 열의 지금 값과 같은 셀은 다시 쓰지 않음 (샤드 실행은 병합 단계에서 비교)
+        writer.set_current(snapshot.read_column(sheets_service, today_column))
+
+    try:
+        with run_metrics.tagged(stage="source"):
+            failed_count = collect_search_term_clicks(
+                snapshot, today_column, writer, start_date, end_date,
+                incremental=not args.no_incremental,
+                per_term=args.per_term,
+                full_rebuild=args.full_rebuild,
+                concurrency=args.concurrency,
+                match_mode=args.match_mode,
+                match_column=args.match_column,
+                shard_spec=args.shard
+            )
+    except Exception as e:
+        print(f"검색어 클릭 수 일괄 조회 중 오류: {e}")
+        exit(1)
+
+    if args.shard:
+        # 시트 기록은 shard.py 병합 단계에서 모든 샤드 결과를 모아 한 번에
+        shard.write_result(args.shard_out, args.shard, SEARCH_TERMS_SHEET_ID, writer, failed_count)
+        if failed_count > 0:
+            exit(1)
+        return
+
+    print(f"\n{len(writer)}개 셀을 시트에 기록합니다...")
+    success_count, fail_count = writer.flush()
+    fail_count += failed_count
 
     print(f"\n모든 데이터 기록 완료! (성공: {success_count}, 실패: {fail_count})")
     
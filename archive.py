@@ -0,0 +1,387 @@
+"""
+오래된 날짜 열 보관(archive)과 추세 조회.
+
+시트는 주마다 날짜 열이 하나씩 늘어나 2025-02-01부터의 기록이 모두 남아 있다. 헤더(1:1)나 넓은 범위를
+읽을 때마다 그만큼 느려지고 셀 한도에도 가까워지므로, 보관 기간(--keep-weeks)보다 오래된 날짜 열을
+로컬 SQLite 파일(키워드, 날짜 단위)로 옮기고 시트에서는 지운다. 추세 조회는 이 파일로 한다.
+
+  archive : 오래된 날짜 열을 값/수식 batchGet 두 번으로 읽어 한 트랜잭션으로 저장하고, 저장한 셀 수를 확인한 뒤
+            --delete일 때만 시트에서 열을 지운다 (연속한 열은 묶어서 batchUpdate 한 번).
+            키 행 값은 추세 조회용 history에, 합계·메모처럼 키 없는 행까지 열의 모든 셀 원본(수식 포함)은
+            cells에 저장해서 열을 지워도 잃는 값이 없다.
+  deltas  : 키워드별 주간 증가량 (이전 날짜 열 대비 누적값 차이)
+  movers  : 두 날짜 사이 증가량 상위 키워드
+  export  : 보관 파일 전체를 gzip CSV로 내보냄
+
+행은 (키워드, 세부 키)로 구분한다. 키워드는 작업 설정의 가장 왼쪽 키/출력용 열(B열),
+세부 키는 나머지 키 열 값(예: 캠페인 E열)을 ' | '로 이은 것이다.
+작업 목록과 키 열은 job_engine과 같은 설정 파일(jobs.json)을 쓴다.
+
+사용 예:
+  python archive.py archive --keep-weeks 12            # 보관만 (시트는 그대로)
+  python archive.py archive --keep-weeks 12 --delete   # 보관 후 시트에서 열 삭제
+  python archive.py deltas --keyword 쇼핑몰 --weeks 8
+  python archive.py movers --top 20
+  python archive.py export --out sheet_history.csv.gz
+"""
+import argparse
+import csv
+import gzip
+import os
+import sqlite3
+from datetime import timedelta
+
+import cassette
+import run_metrics
+from backfill import parse_date, sheet_columns
+from ga_client import get_sheets_service
+from job_engine import DEFAULT_CONFIG_PATH, load_config
+from sheet_snapshot import SheetSnapshot, column_index, read_columns
+
+ARCHIVE_PATH = os.getenv("GA_ARCHIVE_PATH", "./sheet_history.sqlite3")
+
+# 시트에 남겨 둘 최근 주 수
+KEEP_WEEKS = 12
+
+DETAIL_SEPARATOR = " | "
+
+
+class HistoryStore:
+    def __init__(self, path=ARCHIVE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS history (
+                sheet_id TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                detail TEXT NOT NULL,
+                day TEXT NOT NULL,
+                value,
+                PRIMARY KEY (sheet_id, keyword, detail, day)
+            );
+            CREATE TABLE IF NOT EXISTS cells (
+                sheet_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                row_number INTEGER NOT NULL,
+                value,
+                formula TEXT,
+                PRIMARY KEY (sheet_id, day, row_number)
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def save(self, sheet_id, records):
+        """records: (키워드, 세부 키, 날짜 YYYY-MM-DD, 값). 한 트랜잭션으로 넣고 같은 키는 덮어쓴다."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO history (sheet_id, keyword, detail, day, value) VALUES (?, ?, ?, ?, ?)",
+                ((sheet_id, keyword, detail, day, value) for keyword, detail, day, value in records)
+            )
+
+    def save_cells(self, sheet_id, cells):
+        """cells: (날짜 YYYY-MM-DD, 행 번호, 값, 수식 또는 None). 키 없는 행까지 열의 모든 셀 원본."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO cells (sheet_id, day, row_number, value, formula) VALUES (?, ?, ?, ?, ?)",
+                ((sheet_id, day, row_number, value, formula) for day, row_number, value, formula in cells)
+            )
+
+    def count(self, sheet_id, days, table="history"):
+        """days 날짜들에 저장된 행 수 (table: history 또는 cells)."""
+        placeholders = ", ".join("?" for _ in days)
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE sheet_id = ? AND day IN ({placeholders})",
+            (sheet_id, *days)
+        ).fetchone()[0]
+
+    def deltas(self, keyword=None, since=None):
+        """
+        (키워드, 세부 키, 날짜, 누적값, 이전 날짜 대비 증가량)을 키워드·날짜 순으로 반환.
+        숫자가 아닌 셀은 제외하고, 첫 날짜의 증가량은 None.
+        """
+        rows = self.conn.execute("""
+            SELECT keyword, detail, day, value,
+                   value - LAG(value) OVER (PARTITION BY sheet_id, keyword, detail ORDER BY day) AS delta
+            FROM history
+            WHERE typeof(value) IN ('integer', 'real') AND (? IS NULL OR keyword = ?)
+            ORDER BY keyword, detail, day
+        """, (keyword, keyword)).fetchall()
+        return [row for row in rows if since is None or row[2] >= since]
+
+    def days(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT day FROM history ORDER BY day")]
+
+    def movers(self, start_day, end_day, top=10):
+        """start_day → end_day 누적값 증가량 상위 top개 (키워드, 세부 키, 시작값, 끝값, 증가량)."""
+        return self.conn.execute("""
+            SELECT e.keyword, e.detail, COALESCE(s.value, 0), e.value, e.value - COALESCE(s.value, 0) AS delta
+            FROM history e
+            LEFT JOIN history s
+              ON s.sheet_id = e.sheet_id AND s.keyword = e.keyword AND s.detail = e.detail AND s.day = ?
+             AND typeof(s.value) IN ('integer', 'real')
+            WHERE e.day = ? AND typeof(e.value) IN ('integer', 'real')
+            ORDER BY delta DESC, e.keyword
+            LIMIT ?
+        """, (start_day, end_day, top)).fetchall()
+
+    def export_csv(self, out_path):
+        """전체 보관 기록을 gzip CSV로 쓰고 행 수를 반환."""
+        count = 0
+        with gzip.open(out_path, "wt", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["sheet_id", "keyword", "detail", "day", "value"])
+            for row in self.conn.execute(
+                "SELECT sheet_id, keyword, detail, day, value FROM history ORDER BY sheet_id, keyword, detail, day"
+            ):
+                writer.writerow(row)
+                count += 1
+        return count
+
+
+def cell_value(value):
+    """숫자 모양의 문자열(텍스트 서식 셀)은 숫자로 바꿔 추세 조회에 포함되게 한다."""
+    if isinstance(value, str):
+        text = value.strip().replace(",", "")
+        try:
+            number = float(text)
+        except ValueError:
+            return value
+        if number != number or number in (float("inf"), float("-inf")):
+            return value
+        return int(number) if number.is_integer() else number
+    return value
+
+
+def row_keys(snapshot, jobs):
+    """{행 번호: (키워드, 세부 키)}. 키워드는 가장 왼쪽 키 열, 세부 키는 나머지 키 열 값."""
+    letters = sorted(
+        {job["key_column"] for job in jobs} | {job["label_column"] for job in jobs if job.get("label_column")},
+        key=column_index
+    )
+    keys = {}
+    for row_number, _ in snapshot.records():
+        values = [str(snapshot.cell(row_number, letter)).strip() for letter in letters]
+        if values[0]:
+            keys[row_number] = (values[0], DETAIL_SEPARATOR.join(value for value in values[1:] if value))
+    return keys
+
+
+def column_ranges(indexes):
+    """열 인덱스(0부터) 목록을 연속 구간 [(시작, 끝+1)]으로 묶어 오른쪽 구간부터 반환."""
+    ranges = []
+    for index in sorted(indexes):
+        if ranges and ranges[-1][1] == index:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index, index + 1])
+    return [tuple(r) for r in reversed(ranges)]
+
+
+def first_sheet_id(sheets_service, spreadsheet_id):
+    """values API가 범위에 시트 이름이 없을 때 쓰는 첫 번째 시트의 sheetId."""
+    with run_metrics.timed("sheets", "get", spreadsheet_id) as call:
+        result = sheets_service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id, fields="sheets.properties"
+        ).execute()
+        call.set_response(result)
+    return result["sheets"][0]["properties"]["sheetId"]
+
+
+def delete_columns(sheets_service, spreadsheet_id, letters):
+    """날짜 열들을 batchUpdate 한 번으로 삭제. 오른쪽 구간부터 지워서 앞 구간 인덱스가 바뀌지 않게 한다."""
+    sheet_id = first_sheet_id(sheets_service, spreadsheet_id)
+    requests = [
+        {"deleteDimension": {"range": {
+            "sheetId": sheet_id, "dimension": "COLUMNS", "startIndex": start, "endIndex": end
+        }}}
+        for start, end in column_ranges([column_index(letter) for letter in letters])
+    ]
+    with run_metrics.timed("sheets", "spreadsheetBatchUpdate", f"{spreadsheet_id} ({len(requests)} ranges)") as call:
+        response = sheets_service.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id, body={"requests": requests}
+        ).execute()
+        call.set_response(response)
+
+
+def archive_sheet(sheets_service, store, spreadsheet_id, jobs, cutoff, delete=False):
+    """시트 하나에서 cutoff보다 오래된 날짜 열을 보관하고 (보관한 열 수, 보관한 셀 수)를 반환."""
+    print(f"\n=== 시트 {spreadsheet_id} ===")
+    snapshot = SheetSnapshot.load(sheets_service, spreadsheet_id, sheet_columns(jobs))
+    old_columns = sorted((day, letter) for day, letter in snapshot.date_columns().items() if day < cutoff)
+    if not old_columns:
+        print(f"{cutoff} 이전 날짜 열이 없습니다.")
+        return 0, 0
+
+    print(f"{len(old_columns)}개 열 보관: {old_columns[0][1]}({old_columns[0][0]}) ~ "
+          f"{old_columns[-1][1]}({old_columns[-1][0]})")
+    keys = row_keys(snapshot, jobs)
+    letters = [letter for _, letter in old_columns]
+    columns = read_columns(sheets_service, spreadsheet_id, letters, value_render_option="UNFORMATTED_VALUE")
+    formulas = read_columns(sheets_service, spreadsheet_id, letters, value_render_option="FORMULA")
+
+    records = {}
+    cells = []
+    unkeyed = 0
+    formula_count = 0
+    for day, letter in old_columns:
+        day_text = day.strftime("%Y-%m-%d")
+        column_formulas = formulas.get(letter, [])
+        for i, value in enumerate(columns.get(letter, [])):
+            # 1행은 날짜 헤더
+            if i == 0 or value == '':
+                continue
+            formula = column_formulas[i] if i < len(column_formulas) else ''
+            formula = formula if isinstance(formula, str) and formula.startswith("=") else None
+            # 열을 지워도 잃는 값이 없도록 합계·메모 같은 키 없는 행까지 모든 셀 원본을 남긴다
+            cells.append((day_text, i + 1, value, formula))
+            formula_count += formula is not None
+            if i + 1 not in keys:
+                unkeyed += 1
+                continue
+            keyword, detail = keys[i + 1]
+            # 같은 (키워드, 세부 키)가 여러 행에 있으면 아래 행 값
+            records[(keyword, detail, day_text)] = cell_value(value)
+    store.save(spreadsheet_id, ((*key, value) for key, value in records.items()))
+    store.save_cells(spreadsheet_id, cells)
+
+    days = sorted({day for day, _, _, _ in cells})
+    stored = store.count(spreadsheet_id, days, table="cells") if days else 0
+    if stored < len(cells):
+        raise RuntimeError(f"보관 파일에 {stored}개 셀만 저장됐습니다 (예상 {len(cells)}개).")
+    print(f"셀 {len(cells)}개(키 없는 행 {unkeyed}개, 수식 {formula_count}개 포함)를 {store.path}에 저장했습니다.")
+
+    if not delete:
+        print("--delete 없이 실행해 시트의 열은 그대로 둡니다.")
+        return len(old_columns), len(cells)
+
+    print("주의: 다른 열의 수식이 지울 열을 참조하고 있으면 #REF!가 됩니다.")
+    # 날짜가 같은 열이 헤더에 여러 번 있으면 date_columns에는 왼쪽 열만 있으므로 그 열만 지운다
+    delete_columns(sheets_service, spreadsheet_id, letters)
+    print(f"시트에서 {len(letters)}개 열을 삭제했습니다.")
+    return len(old_columns), len(cells)
+
+
+def run_archive(args):
+    jobs, _ = load_config(args.config)
+    jobs_by_sheet = {}
+    for job in jobs:
+        jobs_by_sheet.setdefault(job["sheet_id"], []).append(job)
+    if args.sheets:
+        selected = {sheet.strip() for sheet in args.sheets.split(",") if sheet.strip()}
+        jobs_by_sheet = {sheet: sheet_jobs for sheet, sheet_jobs in jobs_by_sheet.items() if sheet in selected}
+    if not jobs_by_sheet:
+        print("보관할 시트가 없습니다.")
+        exit(1)
+
+    cutoff = cassette.now().date() - timedelta(weeks=args.keep_weeks)
+    print(f"{cutoff} 이전 날짜 열 보관 (최근 {args.keep_weeks}주 유지, 시트 {len(jobs_by_sheet)}개)")
+    sheets_service = get_sheets_service()
+    store = HistoryStore(args.path)
+    failed_count = 0
+    try:
+        for spreadsheet_id, sheet_jobs in jobs_by_sheet.items():
+            try:
+                archive_sheet(sheets_service, store, spreadsheet_id, sheet_jobs, cutoff, delete=args.delete)
+            except Exception as e:
+                print(f"시트 {spreadsheet_id} 보관 중 오류: {e}")
+                failed_count += 1
+    finally:
+        store.close()
+    if failed_count > 0:
+        exit(1)
+
+
+def run_deltas(args):
+    store = HistoryStore(args.path)
+    try:
+        days = store.days()
+        since = days[-args.weeks] if args.weeks and len(days) >= args.weeks else None
+        rows = store.deltas(keyword=args.keyword, since=since)
+    finally:
+        store.close()
+    if not rows:
+        print("보관된 기록이 없습니다.")
+        return
+    print(f"{'키워드':<30}{'날짜':>12}{'누적':>10}{'증가':>8}")
+    for keyword, detail, day, value, delta in rows:
+        name = f"{keyword}{DETAIL_SEPARATOR}{detail}" if detail else keyword
+        print(f"{name:<30}{day:>12}{value:>10g}{'-' if delta is None else format(delta, 'g'):>8}")
+
+
+def run_movers(args):
+    store = HistoryStore(args.path)
+    try:
+        days = store.days()
+        if len(days) < 2:
+            print("비교할 날짜가 두 개 이상 보관돼 있어야 합니다.")
+            return
+        end_day = days[-1]
+        start_day = days[-2]
+        if args.since:
+            earlier = [day for day in days if day <= args.since.strftime("%Y-%m-%d")]
+            start_day = earlier[-1] if earlier else days[0]
+        rows = store.movers(start_day, end_day, top=args.top)
+    finally:
+        store.close()
+    print(f"{start_day} → {end_day} 증가량 상위 {len(rows)}개")
+    for keyword, detail, start_value, end_value, delta in rows:
+        name = f"{keyword}{DETAIL_SEPARATOR}{detail}" if detail else keyword
+        print(f"{name:<30}{start_value:>10g} → {end_value:<10g}{delta:>+8g}")
+
+
+def run_export(args):
+    store = HistoryStore(args.path)
+    try:
+        count = store.export_csv(args.out)
+    finally:
+        store.close()
+    print(f"{count}행을 {args.out}에 내보냈습니다.")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="오래된 날짜 열을 로컬 파일로 보관하고 추세를 조회")
+    parser.add_argument("--path", default=ARCHIVE_PATH, help=f"보관 파일 경로 (기본 {ARCHIVE_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    archive = commands.add_parser("archive", help="보관 기간보다 오래된 날짜 열을 보관 파일로 옮김")
+    archive.add_argument("--config", default=DEFAULT_CONFIG_PATH, help=f"작업 설정 파일 (기본 {DEFAULT_CONFIG_PATH})")
+    archive.add_argument("--sheets", help="보관할 시트 ID (쉼표 구분, 기본: 설정의 모든 시트)")
+    archive.add_argument("--keep-weeks", type=int, default=KEEP_WEEKS,
+                         help=f"시트에 남길 최근 주 수 (기본 {KEEP_WEEKS})")
+    archive.add_argument("--delete", action="store_true", help="보관을 확인한 뒤 시트에서 열을 삭제")
+    archive.add_argument("--profile", type=int, nargs="?", const=10, metavar="N",
+                         help="종료 시 가장 느린 시트 호출 N개 출력 (기본 10)")
+    cassette.add_arguments(archive)
+
+    deltas = commands.add_parser("deltas", help="키워드별 주간 증가량")
+    deltas.add_argument("--keyword", help="조회할 키워드 (기본: 전체)")
+    deltas.add_argument("--weeks", type=int, default=0, help="최근 N개 날짜만 표시 (0이면 전체)")
+
+    movers = commands.add_parser("movers", help="두 날짜 사이 증가량 상위 키워드")
+    movers.add_argument("--top", type=int, default=10, help="표시할 키워드 수 (기본 10)")
+    movers.add_argument("--since", type=parse_date,
+                        help="비교 시작 날짜 (YYYY-MM-DD, 기본: 마지막 날짜의 바로 이전 날짜)")
+
+    export = commands.add_parser("export", help="보관 기록을 gzip CSV로 내보냄")
+    export.add_argument("--out", default="sheet_history.csv.gz", help="출력 경로 (기본 sheet_history.csv.gz)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "archive":
+        run_metrics.install("archive", profile_top=args.profile)
+        cassette.from_args(args)
+        run_archive(args)
+    elif args.command == "deltas":
+        run_deltas(args)
+    elif args.command == "movers":
+        run_movers(args)
+    else:
+        run_export(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+빠진 날짜 열 한꺼번에 채우기.
+
+주간 실행을 놓치면 find_today_column은 오늘 열만 찾으므로 지난 날짜 열은 빈 채로 남는다.
+이 스크립트는 --from ~ --to 사이의 헤더 날짜 열 중 작업 행이 비어 있는 열을 찾고,
+작업마다 date 차원으로 나눈 runReport 한 번(START_DATE ~ 마지막 빈 열 날짜)으로 일자별 클릭을 받아
+메모리에서 열 날짜별 누적값을 만든 뒤, 시트마다 batchUpdate 한 번으로 모든 빈 셀을 채운다.
+N주를 채워도 GA 요청은 작업당 한 번이다 (행이 많으면 페이지 수만큼 늘어남).
+
+작업 목록은 job_engine과 같은 설정 파일(jobs.json)을 쓴다.
+
+사용 예:
+  python backfill.py --from 2025-09-01
+  python backfill.py --from 2025-09-01 --to 2025-10-05 --jobs cafe24pro_source --overwrite
+"""
+import argparse
+from bisect import bisect_left
+from datetime import datetime
+
+import cassette
+import report_cache
+import run_metrics
+from ga_client import get_sheets_service
+from ga_reports import iter_daily_clicks
+from job_engine import DEFAULT_CONFIG_PATH, job_keys, load_config
+from sheet_snapshot import SheetSnapshot, column_index, column_letter, read_columns
+from sheet_writer import SheetWriteBuffer
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def sheet_columns(jobs):
+    """같은 시트 작업들의 키/출력용 열을 모두 담는 범위 (예: B:E)."""
+    indexes = []
+    for job in jobs:
+        indexes.append(column_index(job["key_column"]))
+        if job.get("label_column"):
+            indexes.append(column_index(job["label_column"]))
+    return f"{column_letter(min(indexes))}:{column_letter(max(indexes))}"
+
+
+def is_empty(column_values, row_number):
+    return row_number > len(column_values) or not str(column_values[row_number - 1]).strip()
+
+
+def cumulative_by_date(daily, dates):
+    """
+    (값, 날짜 YYYY-MM-DD, 클릭 수) 목록을 날짜 열별 누적값으로 묶는다.
+    dates는 오름차순 date 리스트이고, 반환값은 {소문자 값: [dates 순서의 누적 클릭 수]}.
+    """
+    date_strings = [d.strftime("%Y-%m-%d") for d in dates]
+    buckets = {}
+    for value, day, clicks in daily:
+        # day가 속하는 첫 번째 열 (그 열 날짜까지의 누적에 처음 들어감)
+        position = bisect_left(date_strings, day)
+        if position == len(date_strings):
+            continue
+        counts = buckets.setdefault(value.lower(), [0] * len(date_strings))
+        counts[position] += clicks
+
+    for counts in buckets.values():
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+    return buckets
+
+
+def backfill_job(job, snapshot, date_columns, existing, writer, overwrite=False):
+    """
+    작업 하나의 빈 날짜 셀을 writer에 추가하고 추가한 셀 수를 반환.
+    date_columns: 날짜 오름차순 [(date, 열 문자)]
+    """
+    keys = job_keys(job, snapshot)
+    missing = [
+        (day, letter) for day, letter in date_columns
+        if overwrite or any(is_empty(existing.get(letter, []), row_number) for row_number, _, _ in keys)
+    ]
+    if not keys or not missing:
+        print(f"[{job['name']}] 채울 날짜 열이 없습니다.")
+        return 0
+
+    dates = [day for day, _ in missing]
+    end_date = dates[-1].strftime("%Y-%m-%d")
+    print(f"[{job['name']}] {len(missing)}개 열 채우기: {', '.join(f'{letter}({day})' for day, letter in missing)}")
+    print(f"[{job['name']}] GA 일자별 데이터 조회: {job['start_date']} ~ {end_date}")
+    daily = iter_daily_clicks(
+        job["property_id"], job["dimension"], job["start_date"], end_date,
+        values=[key for _, key, _ in keys], extra_filters=job.get("filters"),
+        event_name=job["event_name"]
+    )
+    cumulative = cumulative_by_date(daily, dates)
+
+    offsets = job.get("offsets", {})
+    added = 0
+    for row_number, key, label in keys:
+        counts = cumulative.get(key.lower())
+        for i, (_, letter) in enumerate(missing):
+            if not overwrite and not is_empty(existing.get(letter, []), row_number):
+                continue
+            total_clicks = (counts[i] if counts else 0) + offsets.get(key, 0)
+            writer.add(label, letter, row_number, total_clicks)
+            added += 1
+    return added
+
+
+def backfill_sheet(sheets_service, spreadsheet_id, jobs, start, end, overwrite=False):
+    """시트 하나의 작업들을 채우고 (성공 수, 실패 수)를 반환."""
+    print(f"\n=== 시트 {spreadsheet_id} ===")
+    snapshot = SheetSnapshot.load(sheets_service, spreadsheet_id, sheet_columns(jobs))
+    date_columns = sorted(
+        (day, letter) for day, letter in snapshot.date_columns().items() if start <= day <= end
+    )
+    if not date_columns:
+        print(f"{start} ~ {end} 사이의 날짜 열이 없습니다.")
+        return 0, 0
+
+    existing = {} if overwrite else read_columns(
+        sheets_service, spreadsheet_id, [letter for _, letter in date_columns]
+    )
+
+    writer = SheetWriteBuffer(sheets_service, spreadsheet_id)
+    failed_count = 0
+    for job in jobs:
+        with run_metrics.tagged(stage=job["name"]):
+            try:
+                backfill_job(job, snapshot, date_columns, existing, writer, overwrite=overwrite)
+            except Exception as e:
+                print(f"[{job['name']}] 일자별 조회 중 오류: {e}")
+                failed_count += 1
+
+    if not len(writer):
+        return 0, failed_count
+    print(f"\n{len(writer)}개 셀을 시트에 기록합니다...")
+    success_count, fail_count = writer.flush()
+    return success_count, fail_count + failed_count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="기간 내 빈 날짜 열을 GA 요청 한 번으로 채우기")
+    parser.add_argument("--from", dest="start", required=True, type=parse_date,
+                        help="채울 첫 날짜 열 (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end", type=parse_date,
+                        help="채울 마지막 날짜 열 (YYYY-MM-DD, 기본: 오늘)")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help=f"작업 설정 파일 (기본 {DEFAULT_CONFIG_PATH})")
+    parser.add_argument("--jobs", help="실행할 작업 이름 (쉼표 구분, 기본: 전체)")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="값이 있는 셀도 다시 계산해서 덮어씀")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="GA 리포트 로컬 캐시를 사용하지 않음")
+    parser.add_argument("--profile", type=int, nargs="?", const=10, metavar="N",
+                        help="종료 시 가장 느린 GA/시트 호출 N개 출력 (기본 10)")
+    cassette.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_metrics.install("backfill", profile_top=args.profile)
+    cassette.from_args(args)
+    if args.no_cache:
+        report_cache.set_enabled(False)
+
+    today = cassette.now().date()
+    end = min(args.end or today, today)
+    if args.start > end:
+        print(f"기간이 올바르지 않습니다: {args.start} ~ {end}")
+        exit(1)
+
+    jobs, _ = load_config(args.config)
+    if args.jobs:
+        selected = {name.strip() for name in args.jobs.split(",") if name.strip()}
+        jobs = [job for job in jobs if job["name"] in selected]
+    if not jobs:
+        print("실행할 작업이 없습니다.")
+        exit(1)
+
+    jobs_by_sheet = {}
+    for job in jobs:
+        jobs_by_sheet.setdefault(job["sheet_id"], []).append(job)
+
+    print(f"빈 날짜 열 채우기: {args.start} ~ {end} (작업 {len(jobs)}개, 시트 {len(jobs_by_sheet)}개)")
+    sheets_service = get_sheets_service()
+
+    success_count = 0
+    fail_count = 0
+    for spreadsheet_id, sheet_jobs in jobs_by_sheet.items():
+        success, failed = backfill_sheet(sheets_service, spreadsheet_id, sheet_jobs, args.start, end,
+                                         overwrite=args.overwrite)
+        success_count += success
+        fail_count += failed
+
+    print(f"\n채우기 완료! (성공: {success_count}, 실패: {fail_count})")
+    if fail_count > 0:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
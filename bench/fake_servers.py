@@ -0,0 +1,454 @@
+"""
+벤치마크용 로컬 가짜 서버.
+
+GA Data API(runReport / batchRunReports / runRealtimeReport), Sheets API(values get / batchGet /
+update / batchUpdate / append, 스프레드시트 get / 열 삭제 batchUpdate)와 Confluence content API를 HTTP 서버 하나로 흉내 낸다.
+ga_client는 GA_API_ENDPOINT / SHEETS_API_ENDPOINT, 위키는 WIKI_URL을 이 서버 주소로 주면 된다.
+
+  - latency: 요청마다 기다릴 시간(초)
+  - error_rate: 이 확률로 429(RESOURCE_EXHAUSTED)를 돌려줌
+  - quota_tokens: GA 시간당 토큰 한도 (0이면 무제한). 넘으면 429
+요청 수는 (api, 호출) 단위로 counts에 쌓인다.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+# 요청 1건 기본 토큰 + 1,000행마다 추가 토큰
+TOKENS_PER_REQUEST = 10
+TOKENS_PER_1000_ROWS = 1
+
+DEFAULT_GA_LIMIT = 10000
+
+
+def column_index(column):
+    index = 0
+    for ch in column:
+        index = index * 26 + (ord(ch.upper()) - 64)
+    return index - 1
+
+
+def parse_range(cell_range, rows_count):
+    """'B:E', '1:1', 'A3:C3', 'F2' → (첫 행, 마지막 행, 첫 열, 마지막 열) 0부터. None이면 끝까지."""
+    cell_range = unquote(cell_range).split('!')[-1]
+    match = re.fullmatch(r'(\d+):(\d+)', cell_range)
+    if match:
+        return int(match.group(1)) - 1, int(match.group(2)) - 1, 0, None
+    match = re.fullmatch(r'([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?', cell_range.upper())
+    if not match:
+        raise ValueError(f"지원하지 않는 범위: {cell_range}")
+    first_col = column_index(match.group(1))
+    last_col = column_index(match.group(3)) if match.group(3) else first_col
+    first_row = int(match.group(2)) - 1 if match.group(2) else 0
+    if match.group(4):
+        last_row = int(match.group(4)) - 1
+    elif match.group(3) is None and match.group(2):
+        last_row = first_row
+    else:
+        last_row = rows_count - 1
+    return first_row, last_row, first_col, last_col
+
+
+class FakeSheet:
+    """스프레드시트 하나(첫 번째 시트)의 2차원 값 목록."""
+
+    def __init__(self, grid):
+        self.grid = [list(row) for row in grid]
+
+    def read(self, cell_range):
+        first_row, last_row, first_col, last_col = parse_range(cell_range, len(self.grid))
+        values = []
+        for row in self.grid[first_row:last_row + 1]:
+            cells = row[first_col:] if last_col is None else row[first_col:last_col + 1]
+            cells = ['' if cell is None else str(cell) for cell in cells]
+            while cells and cells[-1] == '':
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def write(self, cell_range, values):
+        first_row, _, first_col, _ = parse_range(cell_range, len(self.grid))
+        updated = 0
+        for i, row_values in enumerate(values):
+            row_number = first_row + i
+            while len(self.grid) <= row_number:
+                self.grid.append([])
+            row = self.grid[row_number]
+            for j, value in enumerate(row_values):
+                while len(row) <= first_col + j:
+                    row.append('')
+                row[first_col + j] = value
+                updated += 1
+        return updated
+
+    def delete_columns(self, start, end):
+        """[start, end) 열(0부터)을 지우고 오른쪽 열을 당긴다."""
+        for row in self.grid:
+            del row[start:end]
+
+    def append(self, cell_range, values):
+        """마지막 행 뒤에 values를 붙이고 첫 행 번호(0부터)를 반환."""
+        _, _, first_col, _ = parse_range(cell_range, len(self.grid))
+        start = len(self.grid)
+        for row_values in values:
+            self.grid.append([''] * first_col + list(row_values))
+        return start
+
+
+class FakeState:
+    """가짜 서버의 데이터와 설정, 요청 수."""
+
+    def __init__(self, ga_rows=None, sheet_grid=None, wiki_pages=None,
+                 latency=0.0, error_rate=0.0, quota_tokens=0, seed=0):
+        self.ga_rows = ga_rows or []
+        self.sheet = FakeSheet(sheet_grid or [])
+        self.wiki_pages = wiki_pages or {}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota_tokens = quota_tokens
+        self.tokens_consumed = 0
+        self.random = random.Random(seed)
+        self.counts = Counter()
+        self.errors = Counter()
+        self.lock = threading.Lock()
+
+
+def _match_string(value, string_filter):
+    match_type = string_filter.get("matchType", "EXACT")
+    target = string_filter.get("value", "")
+    if not string_filter.get("caseSensitive", False) and match_type not in ("FULL_REGEXP", "PARTIAL_REGEXP"):
+        value, target = value.lower(), target.lower()
+    if match_type == "EXACT":
+        return value == target
+    if match_type == "BEGINS_WITH":
+        return value.startswith(target)
+    if match_type == "ENDS_WITH":
+        return value.endswith(target)
+    if match_type == "CONTAINS":
+        return target in value
+    flags = 0 if string_filter.get("caseSensitive", False) else re.IGNORECASE
+    if match_type == "FULL_REGEXP":
+        return re.fullmatch(target, value, flags) is not None
+    if match_type == "PARTIAL_REGEXP":
+        return re.search(target, value, flags) is not None
+    return False
+
+
+def compile_filter(expression):
+    """GA FilterExpression을 row_dims → bool 함수로 변환 (inListFilter 값 집합은 한 번만 만든다)."""
+    if not expression:
+        return lambda row_dims: True
+    if "andGroup" in expression:
+        parts = [compile_filter(e) for e in expression["andGroup"].get("expressions", [])]
+        return lambda row_dims: all(part(row_dims) for part in parts)
+    if "orGroup" in expression:
+        parts = [compile_filter(e) for e in expression["orGroup"].get("expressions", [])]
+        return lambda row_dims: any(part(row_dims) for part in parts)
+    if "notExpression" in expression:
+        inner = compile_filter(expression["notExpression"])
+        return lambda row_dims: not inner(row_dims)
+    field = expression.get("filter", {})
+    name = field.get("fieldName")
+    if "stringFilter" in field:
+        string_filter = field["stringFilter"]
+        return lambda row_dims: _match_string(row_dims.get(name, ""), string_filter)
+    if "inListFilter" in field:
+        in_list = field["inListFilter"]
+        if in_list.get("caseSensitive", False):
+            values = set(in_list.get("values", []))
+            return lambda row_dims: row_dims.get(name, "") in values
+        values = {v.lower() for v in in_list.get("values", [])}
+        return lambda row_dims: row_dims.get(name, "").lower() in values
+    return lambda row_dims: True
+
+
+def _resolve_date(value, today):
+    if value == "today":
+        return today
+    if value == "yesterday":
+        return today - timedelta(days=1)
+    match = re.fullmatch(r'(\d+)daysAgo', value)
+    if match:
+        return today - timedelta(days=int(match.group(1)))
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def run_fake_report(ga_rows, body, today=None):
+    """GA runReport 응답 흉내 (eventCount 합계, offset/limit, rowCount)."""
+    today = today or date.today()
+    date_range = body.get("dateRanges", [{}])[0]
+    start = _resolve_date(date_range.get("startDate", "2000-01-01"), today).strftime("%Y%m%d")
+    end = _resolve_date(date_range.get("endDate", "today"), today).strftime("%Y%m%d")
+    names = [d["name"] for d in body.get("dimensions", [])]
+    matches = compile_filter(body.get("dimensionFilter"))
+
+    totals = {}
+    for day, dims, count in ga_rows:
+        if not (start <= day <= end):
+            continue
+        # 실시간 리포트의 minutesAgo는 모두 방금(00)으로 본다
+        row_dims = dict(dims, date=day, minutesAgo="00")
+        if not matches(row_dims):
+            continue
+        key = tuple(row_dims.get(name, "(not set)") for name in names)
+        totals[key] = totals.get(key, 0) + count
+
+    keys = sorted(totals)
+    offset = int(body.get("offset", 0))
+    limit = int(body.get("limit", DEFAULT_GA_LIMIT))
+    page = keys[offset:offset + limit]
+    response = {
+        "dimensionHeaders": [{"name": name} for name in names],
+        "metricHeaders": [{"name": "eventCount", "type": "TYPE_INTEGER"}],
+        "rowCount": len(keys),
+        "kind": "analyticsData#runReport",
+    }
+    if page:
+        response["rows"] = [
+            {
+                "dimensionValues": [{"value": value} for value in key],
+                "metricValues": [{"value": str(totals[key])}],
+            }
+            for key in page
+        ]
+    return response
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeAPI/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _send(self, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message, reason):
+        self._send(status, {"error": {"code": status, "message": message, "status": reason}})
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+    def _enter(self, api, call):
+        """요청 수 집계, 지연, 429 주입. 429를 보냈으면 False."""
+        state = self.state
+        with state.lock:
+            state.counts[(api, call)] += 1
+            inject = state.error_rate and state.random.random() < state.error_rate
+        if state.latency:
+            time.sleep(state.latency)
+        if inject:
+            with state.lock:
+                state.errors[(api, call)] += 1
+            self._error(429, "Injected rate limit", "RESOURCE_EXHAUSTED")
+            return False
+        return True
+
+    def _charge(self, rows):
+        """GA 토큰 차감. 한도를 넘으면 None."""
+        state = self.state
+        cost = TOKENS_PER_REQUEST + rows // 1000 * TOKENS_PER_1000_ROWS
+        with state.lock:
+            if state.quota_tokens and state.tokens_consumed + cost > state.quota_tokens:
+                state.errors[("ga", "quota")] += 1
+                return None
+            state.tokens_consumed += cost
+            remaining = max(0, state.quota_tokens - state.tokens_consumed) if state.quota_tokens else 1000000
+        return {"consumed": cost, "remaining": remaining}
+
+    def _report(self, body):
+        response = run_fake_report(self.state.ga_rows, body)
+        quota = self._charge(response["rowCount"])
+        if quota is None:
+            return None
+        if body.get("returnPropertyQuota"):
+            response["propertyQuota"] = {
+                "tokensPerDay": quota,
+                "tokensPerHour": quota,
+                "tokensPerProjectPerHour": quota,
+                "concurrentRequests": {"consumed": 0, "remaining": 10},
+            }
+        return response
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def _dispatch(self, method):
+        url = urlparse(self.path)
+        path = unquote(url.path)
+        query = parse_qs(url.query)
+        try:
+            if path.startswith("/v1beta/properties/"):
+                return self._ga(method, path)
+            if path.startswith("/v4/spreadsheets/"):
+                return self._sheets(method, path, query)
+            if path.startswith("/rest/api/content/"):
+                return self._wiki(path, query)
+        except Exception as e:
+            return self._error(500, str(e), "INTERNAL")
+        self._error(404, f"Unknown path {path}", "NOT_FOUND")
+
+    def _ga(self, method, path):
+        body = self._body() if method == "POST" else {}
+        call = path.rsplit(":", 1)[-1]
+        if not self._enter("ga", call):
+            return
+        if call == "runReport":
+            response = self._report(body)
+        elif call == "batchRunReports":
+            reports = [self._report(request) for request in body.get("requests", [])]
+            response = None if any(report is None for report in reports) else {"reports": reports}
+        elif call == "runRealtimeReport":
+            realtime_body = dict(body, dateRanges=[{"startDate": "today", "endDate": "today"}])
+            response = self._report(realtime_body)
+        else:
+            return self._error(404, f"Unknown GA method {call}", "NOT_FOUND")
+        if response is None:
+            return self._error(429, "Exhausted property tokens per hour", "RESOURCE_EXHAUSTED")
+        self._send(200, response)
+
+    def _sheets(self, method, path, query):
+        rest = path[len("/v4/spreadsheets/"):]
+        spreadsheet_id, _, rest = rest.partition("/")
+        sheet = self.state.sheet
+        if spreadsheet_id.endswith(":batchUpdate"):
+            if not self._enter("sheets", "spreadsheetBatchUpdate"):
+                return
+            body = self._body()
+            with self.state.lock:
+                for request in body.get("requests", []):
+                    dimension_range = request.get("deleteDimension", {}).get("range", {})
+                    if dimension_range.get("dimension") == "COLUMNS":
+                        sheet.delete_columns(dimension_range["startIndex"], dimension_range["endIndex"])
+            return self._send(200, {"spreadsheetId": spreadsheet_id.split(":")[0], "replies": []})
+        if not rest and method == "GET":
+            if not self._enter("sheets", "get"):
+                return
+            return self._send(200, {
+                "spreadsheetId": spreadsheet_id,
+                "sheets": [{"properties": {"sheetId": 0, "title": "Sheet1", "index": 0}}],
+            })
+        if rest == "values:batchGet":
+            if not self._enter("sheets", "batchGet"):
+                return
+            ranges = query.get("ranges", [])
+            with self.state.lock:
+                value_ranges = [{"range": r, "majorDimension": "ROWS", "values": sheet.read(r)} for r in ranges]
+            return self._send(200, {"spreadsheetId": spreadsheet_id, "valueRanges": value_ranges})
+        if rest == "values:batchUpdate":
+            if not self._enter("sheets", "batchUpdate"):
+                return
+            body = self._body()
+            with self.state.lock:
+                updated = sum(sheet.write(item["range"], item.get("values", [])) for item in body.get("data", []))
+            return self._send(200, {"spreadsheetId": spreadsheet_id, "totalUpdatedCells": updated})
+        if rest.startswith("values/") and rest.endswith(":append"):
+            if not self._enter("sheets", "append"):
+                return
+            cell_range = rest[len("values/"):-len(":append")]
+            body = self._body()
+            with self.state.lock:
+                start = sheet.append(cell_range, body.get("values", []))
+            return self._send(200, {"spreadsheetId": spreadsheet_id, "updates": {"updatedRange": f"A{start + 1}"}})
+        if rest.startswith("values/"):
+            cell_range = rest[len("values/"):]
+            if method == "PUT":
+                if not self._enter("sheets", "update"):
+                    return
+                body = self._body()
+                with self.state.lock:
+                    updated = sheet.write(cell_range, body.get("values", []))
+                return self._send(200, {"spreadsheetId": spreadsheet_id, "updatedCells": updated})
+            if not self._enter("sheets", "get"):
+                return
+            with self.state.lock:
+                values = sheet.read(cell_range)
+            return self._send(200, {"range": cell_range, "majorDimension": "ROWS", "values": values})
+        self._error(404, f"Unknown Sheets path {path}", "NOT_FOUND")
+
+    def _wiki(self, path, query):
+        rest = path[len("/rest/api/content/"):].strip("/")
+        page_id, _, sub = rest.partition("/")
+        page = self.state.wiki_pages.get(page_id)
+        if sub == "child/page":
+            if not self._enter("wiki", "child"):
+                return
+            children = page.get("children", []) if page else []
+            start = int(query.get("start", ["0"])[0])
+            limit = int(query.get("limit", ["25"])[0])
+            chunk = children[start:start + limit]
+            payload = {
+                "results": [
+                    {"id": child, "version": {"number": self.state.wiki_pages[child]["version"]}}
+                    for child in chunk
+                ],
+                "start": start, "limit": limit, "size": len(chunk), "_links": {},
+            }
+            if start + limit < len(children):
+                payload["_links"]["next"] = f"/rest/api/content/{page_id}/child/page?start={start + limit}"
+            return self._send(200, payload)
+        if not self._enter("wiki", "content"):
+            return
+        if page is None:
+            return self._send(404, {"statusCode": 404, "message": "No content found"})
+        expand = ",".join(query.get("expand", []))
+        payload = {"id": page_id, "type": "page", "version": {"number": page["version"]}}
+        if "body.storage" in expand:
+            payload["body"] = {"storage": {"value": page["html"], "representation": "storage"}}
+        self._send(200, payload)
+
+
+class FakeServer:
+    """가짜 API 서버를 백그라운드 스레드로 띄운다."""
+
+    def __init__(self, state=None, host="127.0.0.1", port=0):
+        self.httpd = ThreadingHTTPServer((host, port), FakeHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = state or FakeState()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def state(self):
+        return self.httpd.state
+
+    @state.setter
+    def state(self, state):
+        self.httpd.state = state
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
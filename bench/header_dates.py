@@ -0,0 +1,77 @@
+"""
+헤더 날짜 해석(sheet_snapshot.build_date_columns) 회귀 확인.
+
+1년이 넘는 주간 MM/DD 헤더, YYYY-MM-DD 기준 열, 미리 만들어 둔 미래 열 등의 경우를 만들어
+날짜 → 열 문자 결과가 기대값과 다르면 내용을 출력하고 exit 1.
+
+사용 예:
+  python bench/header_dates.py
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sheet_snapshot import build_date_columns, column_letter  # noqa: E402
+
+# 헤더 앞의 날짜가 아닌 열 (채널, 키워드, ..., UTM)
+PREFIX = ["채널", "키워드", "", "", "UTM"]
+
+
+def weekly(start, end):
+    days = []
+    while start <= end:
+        days.append(start)
+        start += timedelta(weeks=1)
+    return days
+
+
+def expected_columns(days):
+    return {day: column_letter(len(PREFIX) + i) for i, day in enumerate(days)}
+
+
+def cases():
+    today = date(2026, 10, 17)
+    # 2025-02-01부터 오늘까지 매주 MM/DD (1년 이상)
+    days = weekly(date(2025, 2, 1), today)
+    yield ("MM/DD 1년 이상", PREFIX + [f"{d.month:02d}/{d.day:02d}" for d in days], today, expected_columns(days))
+
+    # 맨 왼쪽만 YYYY-MM-DD, 나머지 MM/DD
+    header = PREFIX + [days[0].strftime("%Y-%m-%d")] + [f"{d.month}/{d.day}" for d in days[1:]]
+    yield ("왼쪽 YYYY-MM-DD + MM/DD", header, today, expected_columns(days))
+
+    # 중간에 YYYY.MM.DD가 섞인 경우
+    header = PREFIX + [
+        d.strftime("%Y.%m.%d") if i % 10 == 0 else f"{d.month}/{d.day}" for i, d in enumerate(days)
+    ]
+    yield ("중간 YYYY.MM.DD 기준", header, today, expected_columns(days))
+
+    # 다음 주 열을 미리 만들어 둔 경우
+    ahead = weekly(date(2025, 12, 6), today + timedelta(weeks=2))
+    yield ("미래 열", PREFIX + [f"{d.month}/{d.day}" for d in ahead], today, expected_columns(ahead))
+
+    # 연말을 넘는 짧은 시트
+    year_end = weekly(date(2025, 12, 13), date(2026, 1, 17))
+    yield ("연말 넘김", PREFIX + [f"{d.month}/{d.day}" for d in year_end], date(2026, 1, 20),
+           expected_columns(year_end))
+
+
+def main():
+    failures = 0
+    for name, header, today, expected in cases():
+        found = build_date_columns(header, today=today)
+        if found == expected:
+            print(f"✓ {name}")
+            continue
+        failures += 1
+        wrong = sorted(set(found.items()) ^ set(expected.items()), key=lambda item: item[1])
+        print(f"✗ {name}: 다른 항목 {len(wrong)}개 (예: {wrong[:4]})")
+        print(f"  오늘 열: {found.get(today)} (기대 {expected.get(today)})")
+    if failures:
+        sys.exit(1)
+    print("헤더 날짜 해석이 모두 기대값과 같습니다.")
+
+
+if __name__ == "__main__":
+    main()
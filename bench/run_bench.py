@@ -0,0 +1,249 @@
+"""
+로컬 가짜 서버(bench/fake_servers.py)로 각 스크립트를 실행해 보는 벤치마크.
+
+키워드 10 / 100 / 1,000 / 10,000개짜리 합성 데이터(시트 + GA 클릭 + 위키 페이지)를 만들고,
+작업마다 스크립트를 새 프로세스로 실행해서 API 요청 수, 실행 시간, 최대 메모리를 잰다.
+실제 GA property / 시트 / 위키에는 요청하지 않는다.
+
+사용 예:
+  python bench/run_bench.py                                  # 전체 작업 x 전체 크기
+  python bench/run_bench.py --jobs source --keywords 10,100 --latency-ms 50 --error-rate 0.05
+  python bench/run_bench.py --save bench.json                # 결과 저장
+  python bench/run_bench.py --compare bench.json             # 저장한 결과보다 요청 수가 늘면 exit 1
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_servers import FakeServer, FakeState  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+JOBS = {
+    "wiki": "cafe24pro_parameter.py",
+    "source": "GA_cafe24pro_data.py",
+    "source_medium": "GA_cafe24pro_data_for_viralpaid_youtube.py",
+    "campaign": "cafe24pro_parameter_campain.py",
+    "pipeline": "pipeline.py",
+}
+
+# 인자를 받지 않는 작업
+NO_ARGS_JOBS = {"wiki"}
+
+WORKLOADS = [10, 100, 1000, 10000]
+
+WIKI_PAGE_ID = "1000"
+
+# 위키에만 있고 시트에는 없는 키워드 비율
+NEW_WIKI_KEYWORD_RATIO = 0.05
+
+
+def build_workload(keyword_count, days=28, seed=0):
+    """키워드 keyword_count개짜리 (GA 행, 시트 값, 위키 페이지) 합성 데이터."""
+    rng = random.Random(seed)
+    today = date.today()
+
+    header = ["채널", "키워드", "", "", "UTM"]
+    header += [(today - timedelta(weeks=week)).strftime("%Y-%m-%d") for week in range(3, 0, -1)]
+    header.append(today.strftime("%Y-%m-%d"))
+    grid = [header]
+
+    ga_rows = []
+    keywords = [f"kw{i:05d}" for i in range(keyword_count)] + ["viral / paid_youtube"]
+    for i, keyword in enumerate(keywords):
+        campaign = f"pr_{keyword}" if i % 2 == 0 else ""
+        grid.append([f"채널{i % 7}", keyword, "", "", campaign])
+        dims = {
+            "sessionSource": keyword,
+            "sessionCampaignName": campaign or "(not set)",
+            "sessionSourceMedium": keyword if "/" in keyword else f"{keyword} / referral",
+        }
+        for offset in rng.sample(range(days), 3):
+            day = (today - timedelta(days=offset)).strftime("%Y%m%d")
+            ga_rows.append((day, dict(dims, eventName="click"), rng.randint(1, 20)))
+        day = (today - timedelta(days=rng.randrange(days))).strftime("%Y%m%d")
+        ga_rows.append((day, dict(dims, eventName="page_view"), rng.randint(1, 50)))
+
+    new_count = max(1, int(keyword_count * NEW_WIKI_KEYWORD_RATIO))
+    wiki_keywords = keywords[:-1] + [f"newkw{i:05d}" for i in range(new_count)]
+    links = "".join(
+        f'<p><a href="https://example.com/?utm_source={keyword}&amp;utm_campaign=pr">(채널{i % 7}) 글{i}</a></p>'
+        for i, keyword in enumerate(wiki_keywords)
+    )
+    wiki_pages = {WIKI_PAGE_ID: {"version": 1, "html": links, "children": []}}
+    return ga_rows, grid, wiki_pages
+
+
+def write_fake_token(path):
+    with open(path, "w") as f:
+        json.dump({
+            "token": "bench-token",
+            "refresh_token": "bench-refresh",
+            "client_id": "bench",
+            "client_secret": "bench",
+            # 만료 시간이 없으면 바로 갱신을 시도하므로 먼 미래로 둔다
+            "expiry": "2099-01-01T00:00:00Z",
+            "scopes": [
+                "https://www.googleapis.com/auth/analytics.readonly",
+                "https://www.googleapis.com/auth/spreadsheets",
+            ],
+        }, f)
+
+
+def child_env(server_url, workdir):
+    token_path = os.path.join(workdir, "token.json")
+    write_fake_token(token_path)
+    env = dict(os.environ)
+    env.pop("GITHUB_ACTIONS", None)
+    env.update({
+        "GA_API_ENDPOINT": server_url,
+        "SHEETS_API_ENDPOINT": server_url,
+        "GA_TOKEN_PATH": token_path,
+        "GA_CLIENT_SECRET_PATH": os.path.join(workdir, "client_secret.json"),
+        "TOKEN_FILE": token_path,
+        "CLIENT_SECRET_FILE": os.path.join(workdir, "client_secret.json"),
+        "SPREADSHEET_ID": "bench-sheet",
+        "WIKI_URL": server_url,
+        "WIKI_PAGE_ID": WIKI_PAGE_ID,
+        "WIKI_PAGE_IDS": "",
+        "WIKI_USERNAME": "bench",
+        "WIKI_PASSWORD": "bench",
+        "WIKI_CACHE_PATH": os.path.join(workdir, "wiki_pr_cache.json"),
+        "GA_REPORT_CACHE": "off",
+        "GA_REPORT_CACHE_PATH": os.path.join(workdir, "ga_report_cache.sqlite3"),
+        "GA_DAILY_STORE_PATH": os.path.join(workdir, "ga_daily_clicks.sqlite3"),
+        "RUN_METRICS_DIR": workdir,
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def run_job(server, job, keyword_count, args):
+    """작업 하나를 새 프로세스로 실행하고 측정값 딕셔너리를 반환."""
+    ga_rows, grid, wiki_pages = build_workload(keyword_count, seed=args.seed)
+    server.state = FakeState(
+        ga_rows=ga_rows, sheet_grid=grid, wiki_pages=wiki_pages,
+        latency=args.latency_ms / 1000.0, error_rate=args.error_rate,
+        quota_tokens=args.quota_tokens, seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory(prefix=f"bench_{job}_") as workdir:
+        command = [sys.executable, os.path.join(REPO_ROOT, JOBS[job])]
+        if job not in NO_ARGS_JOBS:
+            command += args.job_args.split()
+        log_path = os.path.join(workdir, "output.log")
+        with open(log_path, "w") as log:
+            started = time.perf_counter()
+            process = subprocess.Popen(command, cwd=workdir, env=child_env(server.url, workdir),
+                                       stdout=log, stderr=subprocess.STDOUT)
+            _, status, usage = os.wait4(process.pid, 0)
+            wall = time.perf_counter() - started
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        if process.returncode != 0 and args.verbose:
+            with open(log_path) as log:
+                print(f"--- {job} x {keyword_count} 출력 (마지막 20줄) ---")
+                print("".join(log.readlines()[-20:]))
+
+    # Linux는 KB, macOS는 바이트
+    peak_bytes = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    counts = server.state.counts
+    return {
+        "job": job,
+        "keywords": keyword_count,
+        "requests": sum(counts.values()),
+        "ga_requests": sum(n for (api, _), n in counts.items() if api == "ga"),
+        "sheets_requests": sum(n for (api, _), n in counts.items() if api == "sheets"),
+        "wiki_requests": sum(n for (api, _), n in counts.items() if api == "wiki"),
+        "calls": {f"{api}.{call}": n for (api, call), n in sorted(counts.items())},
+        "rate_limited": sum(server.state.errors.values()),
+        "ga_tokens": server.state.tokens_consumed,
+        "wall_seconds": round(wall, 3),
+        "peak_memory_mb": round(peak_bytes / 1024 / 1024, 1),
+        "exit_code": process.returncode,
+    }
+
+
+def print_table(results):
+    print(f"\n{'작업':<14}{'키워드':>8}{'요청':>7}{'GA':>6}{'시트':>6}{'위키':>6}{'429':>6}"
+          f"{'토큰':>8}{'시간(s)':>10}{'메모리(MB)':>12}{'종료':>6}")
+    for r in results:
+        print(f"{r['job']:<14}{r['keywords']:>8}{r['requests']:>7}{r['ga_requests']:>6}{r['sheets_requests']:>6}"
+              f"{r['wiki_requests']:>6}{r['rate_limited']:>6}{r['ga_tokens']:>8}{r['wall_seconds']:>10.2f}"
+              f"{r['peak_memory_mb']:>12.1f}{r['exit_code']:>6}")
+
+
+def compare(results, baseline_path, tolerance):
+    """기준 결과보다 요청 수가 tolerance 넘게 늘어난 (작업, 키워드 수) 목록."""
+    with open(baseline_path) as f:
+        baseline = {(r["job"], r["keywords"]): r for r in json.load(f)}
+    regressions = []
+    for r in results:
+        base = baseline.get((r["job"], r["keywords"]))
+        if base and r["requests"] > base["requests"] + tolerance:
+            regressions.append((r["job"], r["keywords"], base["requests"], r["requests"]))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="가짜 GA/시트/위키 서버로 스크립트 성능 측정")
+    parser.add_argument("--jobs", default=",".join(JOBS), help=f"실행할 작업 (쉼표 구분) - {', '.join(JOBS)}")
+    parser.add_argument("--keywords", default=",".join(map(str, WORKLOADS)), help="키워드 수 (쉼표 구분)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="가짜 서버 요청당 지연(ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="429 주입 확률 (0~1)")
+    parser.add_argument("--quota-tokens", type=int, default=0, help="GA 시간당 토큰 한도 (0이면 무제한)")
+    parser.add_argument("--seed", type=int, default=0, help="합성 데이터 / 429 주입 시드")
+    parser.add_argument("--job-args", default="", help="GA 작업 스크립트에 넘길 인자 (예: \"--per-term\")")
+    parser.add_argument("--save", help="결과를 JSON으로 저장할 경로")
+    parser.add_argument("--compare", help="기준 결과 JSON. 요청 수가 늘면 exit 1")
+    parser.add_argument("--tolerance", type=int, default=0, help="--compare 허용 요청 수 증가분")
+    parser.add_argument("--verbose", action="store_true", help="실패한 실행의 출력 표시")
+    args = parser.parse_args(argv)
+
+    args.jobs = [job.strip() for job in args.jobs.split(",") if job.strip()]
+    unknown = [job for job in args.jobs if job not in JOBS]
+    if unknown:
+        parser.error(f"알 수 없는 작업: {', '.join(unknown)}")
+    args.keywords = [int(n) for n in args.keywords.split(",") if n.strip()]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = []
+    with FakeServer() as server:
+        print(f"가짜 API 서버: {server.url}")
+        for keyword_count in args.keywords:
+            for job in args.jobs:
+                result = run_job(server, job, keyword_count, args)
+                print(f"{job} x {keyword_count}: 요청 {result['requests']}건, "
+                      f"{result['wall_seconds']:.2f}s, {result['peak_memory_mb']:.1f}MB (종료 코드 {result['exit_code']})")
+                results.append(result)
+
+    print_table(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.save}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print("\n요청 수가 늘어난 항목:")
+            for job, keyword_count, before, after in regressions:
+                print(f"  {job} x {keyword_count}: {before} → {after}")
+            sys.exit(1)
+        print("\n기준 결과 대비 요청 수 증가 없음")
+
+
+if __name__ == "__main__":
+    main()
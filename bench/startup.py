@@ -0,0 +1,122 @@
+"""
+진입 스크립트 시작 비용(import + GA/시트 서비스 생성) 측정과 예산 확인.
+
+스크립트마다 새 프로세스에서
+  1) 모듈 import 시간
+  2) analyticsdata v1beta / sheets v4 서비스 생성 시간 (네트워크 없이, 익명 인증 정보)
+을 --runs번 재서 중앙값을 표시한다. 중앙값이 예산을 넘거나, 시작 과정에서 브라우저 인증용
+google_auth_oauthlib가 import 되면 exit 1.
+
+사용 예:
+  python bench/startup.py
+  python bench/startup.py --modules pipeline,job_engine --runs 7 --import-budget-ms 300
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    "pipeline",
+    "job_engine",
+    "backfill",
+    "GA_cafe24pro_data",
+    "GA_cafe24pro_data_for_viralpaid_youtube",
+    "cafe24pro_parameter_campain",
+    "cafe24pro_parameter",
+]
+
+# 중앙값 예산(ms). CI 러너 편차를 감안해 측정값의 2배 정도로 둔다.
+IMPORT_BUDGET_MS = 400
+STARTUP_BUDGET_MS = 600
+
+# 자식 프로세스에서 실행할 측정 코드
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+from google.auth.credentials import AnonymousCredentials
+import ga_client
+credentials = AnonymousCredentials()
+ga_client.get_analytics_service(credentials)
+ga_client.get_sheets_service(credentials)
+built = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "build_ms": (built - imported) * 1000,
+    "oauthlib": "google_auth_oauthlib" in sys.modules,
+}}))
+"""
+
+
+def measure(module, runs):
+    """모듈 하나를 runs번 측정해서 항목별 중앙값 딕셔너리를 반환."""
+    samples = []
+    env = dict(os.environ, GA_REPORT_CACHE="off")
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module)],
+            cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    import_ms = statistics.median(s["import_ms"] for s in samples)
+    build_ms = statistics.median(s["build_ms"] for s in samples)
+    return {
+        "module": module,
+        "import_ms": round(import_ms, 1),
+        "build_ms": round(build_ms, 1),
+        "startup_ms": round(import_ms + build_ms, 1),
+        "oauthlib": any(s["oauthlib"] for s in samples),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="진입 스크립트 import / 서비스 생성 시간 측정")
+    parser.add_argument("--modules", default=",".join(MODULES), help="측정할 모듈 (쉼표 구분)")
+    parser.add_argument("--runs", type=int, default=5, help="모듈당 측정 횟수 (중앙값 사용)")
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS,
+                        help=f"import 시간 예산 (기본 {IMPORT_BUDGET_MS}ms)")
+    parser.add_argument("--startup-budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help=f"import + 서비스 생성 시간 예산 (기본 {STARTUP_BUDGET_MS}ms)")
+    parser.add_argument("--save", help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args(argv)
+    args.modules = [module.strip() for module in args.modules.split(",") if module.strip()]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = [measure(module, args.runs) for module in args.modules]
+
+    print(f"{'모듈':<44}{'import(ms)':>12}{'서비스(ms)':>12}{'합계(ms)':>10}  oauthlib")
+    over_budget = []
+    for r in results:
+        print(f"{r['module']:<44}{r['import_ms']:>12.1f}{r['build_ms']:>12.1f}{r['startup_ms']:>10.1f}  "
+              f"{'예' if r['oauthlib'] else '아니오'}")
+        if r["import_ms"] > args.import_budget_ms:
+            over_budget.append(f"{r['module']}: import {r['import_ms']}ms > {args.import_budget_ms}ms")
+        if r["startup_ms"] > args.startup_budget_ms:
+            over_budget.append(f"{r['module']}: 시작 {r['startup_ms']}ms > {args.startup_budget_ms}ms")
+        if r["oauthlib"]:
+            over_budget.append(f"{r['module']}: 시작 과정에서 google_auth_oauthlib를 import 함")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.save}")
+
+    if over_budget:
+        print("\n예산 초과:")
+        for line in over_budget:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\n모든 모듈이 시작 예산 안에 있습니다.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,16 @@
+import argparse
+import json
 import os
-import time
 import re
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote
 import requests
-from bs4 import BeautifulSoup
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+from bs4 import BeautifulSoup, SoupStrainer
+import cassette
+import ga_client
+import run_metrics
+from sheet_snapshot import SheetSnapshot
+from sheet_writer import SheetWriteBuffer
 
 # 환경변수(.env) 로드
 try:
@@ -25,30 +28,91 @@ WIKI_PAGE_ID = os.getenv('WIKI_PAGE_ID')
 WIKI_USERNAME = os.getenv('WIKI_USERNAME')
 WIKI_PASSWORD = os.getenv('WIKI_PASSWORD')
 
+# 여러 루트 페이지(쉼표 구분)와 하위 페이지까지 크롤링. 없으면 WIKI_PAGE_ID 한 페이지만
+WIKI_PAGE_IDS = [page_id.strip() for page_id in (os.getenv('WIKI_PAGE_IDS') or WIKI_PAGE_ID or '').split(',') if page_id.strip()]
+# 루트에서 몇 단계 아래 하위 페이지까지 볼지 (0이면 루트 페이지만)
+WIKI_CRAWL_DEPTH = int(os.getenv('WIKI_CRAWL_DEPTH', '0'))
+# 동시에 받을 페이지 수
+WIKI_CONCURRENCY = int(os.getenv('WIKI_CONCURRENCY', '4'))
+
+# 위키 페이지별 버전과 추출한 PR 링크를 저장해 두는 로컬 캐시
+WIKI_CACHE_PATH = os.getenv('WIKI_CACHE_PATH', './wiki_pr_cache.json')
+
+# lxml(requirements.txt)이 설치돼 있으면 더 빠른 파서 사용, 없으면 내장 html.parser
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# utm_campaign=pr 이 들어간 <a href>만 파싱
+PR_LINK_STRAINER = SoupStrainer('a', href=re.compile(r'utm_campaign=pr'))
+
+_wiki_session = None
+
 def get_credentials():
-    creds = None
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
-    return creds
+    return ga_client.get_credentials(
+        token_file=TOKEN_FILE,
+        client_secret_file=CLIENT_SECRET_FILE,
+        scopes=SCOPES
+    )
 
 def parse_channel(text):
     m = re.match(r'^\(([^)]+)\)\s*(.+)$', text)
     return (m.group(2), m.group(1)) if m else (text, None)
 
-def get_wiki_pr_data():
-    url = f"{WIKI_URL}/rest/api/content/{WIKI_PAGE_ID}?expand=body.storage"
-    r = requests.get(url, auth=(WIKI_USERNAME, WIKI_PASSWORD))
-    html = r.json()['body']['storage']['value']
-    soup = BeautifulSoup(html, 'html.parser')
+def get_wiki_session():
+    """위키 요청용 requests.Session (인증 정보 + 동시 요청 수만큼 keep-alive 연결 풀)."""
+    global _wiki_session
+    if _wiki_session is None:
+        _wiki_session = requests.Session()
+        _wiki_session.auth = (WIKI_USERNAME, WIKI_PASSWORD)
+        adapter = cassette.http_adapter(pool_connections=1, pool_maxsize=max(1, WIKI_CONCURRENCY))
+        _wiki_session.mount('https://', adapter)
+        _wiki_session.mount('http://', adapter)
+    return _wiki_session
+
+def wiki_get(path):
+    with run_metrics.timed("wiki", "get", path) as call:
+        r = get_wiki_session().get(f"{WIKI_URL}/rest/api/content/{path}")
+        call.set_response(None, size=len(r.content))
+        r.raise_for_status()
+        return r.json()
+
+def load_wiki_cache():
+    """페이지 ID → {'version', 'pr_data'} 딕셔너리. 캐시가 없거나 깨졌으면 빈 딕셔너리."""
+    try:
+        with open(cassette.state_path('wiki_pr_cache.json', WIKI_CACHE_PATH), encoding='utf-8') as f:
+            return json.load(f).get('pages', {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+def save_wiki_cache(pages):
+    try:
+        with open(cassette.state_path('wiki_pr_cache.json', WIKI_CACHE_PATH), 'w', encoding='utf-8') as f:
+            json.dump({'pages': pages}, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"위키 캐시 저장 실패: {e}")
+
+def get_wiki_version(page_id):
+    """본문 없이 페이지 버전 번호만 조회."""
+    return wiki_get(f"{page_id}?expand=version")['version']['number']
+
+def get_child_pages(page_id):
+    """바로 아래 하위 페이지의 (ID, 버전 번호) 리스트. 버전은 목록 응답에 같이 받는다."""
+    children = []
+    start = 0
+    while True:
+        page = wiki_get(f"{page_id}/child/page?expand=version&limit=100&start={start}")
+        results = page.get('results', [])
+        children.extend((child['id'], child.get('version', {}).get('number')) for child in results)
+        start += len(results)
+        if not results or 'next' not in page.get('_links', {}):
+            return children
+
+def parse_pr_links(html):
     pr_data = []
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=PR_LINK_STRAINER)
     for a in soup.find_all('a', href=True):
         href = a['href']
         if 'utm_campaign=pr' in href:
@@ -60,40 +124,143 @@ def get_wiki_pr_data():
                 pr_data.append((keyword, a_txt, c_txt))
     return pr_data
 
-def get_first_empty_row(service, col='B'):
-    res = service.spreadsheets().values().get(spreadsheetId=SPREADSHEET_ID, range=f"{col}:{col}").execute()
-    vals = res.get('values', [])
-    for i, v in enumerate(vals[1:], start=2):
-        if not v or not v[0].strip():
-            return i
-    return len(vals) + 1
-
-def keyword_exists(service, keyword):
-    res = service.spreadsheets().values().get(spreadsheetId=SPREADSHEET_ID, range="B:B").execute()
-    for row in res.get('values', []):
-        if row and row[0] == keyword:
-            return True
-    return False
-
-def add_to_sheet(service, keyword, a_txt, c_txt, row):
-    vals = [[a_txt or '', keyword, c_txt or '']]
-    service.spreadsheets().values().update(
-        spreadsheetId=SPREADSHEET_ID,
-        range=f"A{row}:C{row}",
-        valueInputOption='USER_ENTERED',
-        body={'values': vals}
-    ).execute()
-
-def main():
-    creds = get_credentials()
-    sheets = build('sheets', 'v4', credentials=creds)
-    pr_data = get_wiki_pr_data()
+def get_page_pr_data(page_id, version, cached):
+    """
+    페이지 하나의 (버전, PR 링크 리스트)를 반환.
+    버전을 모르면 버전만 먼저 확인하고, 캐시와 같으면 본문을 받지 않는다.
+    """
+    if cached is not None:
+        if version is None:
+            version = get_wiki_version(page_id)
+        if version == cached.get('version'):
+            return version, [tuple(item) for item in cached['pr_data']], False
+
+    page = wiki_get(f"{page_id}?expand=body.storage,version")
+    pr_data = parse_pr_links(page['body']['storage']['value'])
+    return page.get('version', {}).get('number'), pr_data, True
+
+def crawl_wiki_pr_data(root_ids, max_depth=0, max_workers=WIKI_CONCURRENCY):
+    """
+    루트 페이지들과 max_depth 단계 아래 하위 페이지까지 동시에 받아서 PR 링크를 모은다.
+    페이지 순서(루트 순서 → 단계별 하위 페이지 순서)대로 합치고, 같은 키워드는 처음 나온 것만 남긴다.
+    """
+    cache = load_wiki_cache()
+    pages = {}
+    order = []
+    visited = set()
+
+    def visit(page_id, version, depth):
+        version, pr_data, downloaded = get_page_pr_data(page_id, version, cache.get(page_id))
+        children = get_child_pages(page_id) if depth < max_depth else []
+        return version, pr_data, downloaded, children
+
+    tags = run_metrics.current_tags()
+
+    def visit_tagged(page_id, version, depth):
+        with run_metrics.tagged(**dict(tags, label=page_id)):
+            return visit(page_id, version, depth)
+
+    level = [(page_id, None) for page_id in root_ids]
+    downloaded_count = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        for depth in range(max_depth + 1):
+            level = [(page_id, version) for page_id, version in dict(level).items() if page_id not in visited]
+            if not level:
+                break
+            visited.update(page_id for page_id, _ in level)
+            futures = [executor.submit(visit_tagged, page_id, version, depth) for page_id, version in level]
+
+            next_level = []
+            for (page_id, _), future in zip(level, futures):
+                version, pr_data, downloaded, children = future.result()
+                pages[page_id] = {'version': version, 'pr_data': pr_data}
+                order.append(page_id)
+                downloaded_count += downloaded
+                next_level.extend(children)
+            level = next_level
+
+    save_wiki_cache(pages)
+
+    merged = []
+    seen = set()
+    for page_id in order:
+        for keyword, a_txt, c_txt in pages[page_id]['pr_data']:
+            if keyword in seen:
+                continue
+            seen.add(keyword)
+            merged.append((keyword, a_txt, c_txt))
+    print(f"위키 페이지 {len(order)}개 확인 (다운로드 {downloaded_count}개, 캐시 {len(order) - downloaded_count}개), "
+          f"PR 키워드 {len(merged)}개")
+    return merged
+
+def get_wiki_pr_data():
+    """
+    위키 페이지(WIKI_PAGE_IDS, 하위 WIKI_CRAWL_DEPTH 단계까지)의 PR 링크를 (키워드, A열, C열) 리스트로 반환.
+    페이지마다 버전이 캐시와 같으면 캐시를 쓰고, 바뀌었을 때만 본문을 받아 다시 파싱한다.
+    """
+    return crawl_wiki_pr_data(WIKI_PAGE_IDS, max_depth=WIKI_CRAWL_DEPTH, max_workers=WIKI_CONCURRENCY)
+
+def get_new_pr_rows(snapshot, pr_data):
+    """
+    위키 PR 링크 중 시트 B열에 없는 키워드만 골라 (키워드, A열, C열) 리스트로 반환.
+    위키 페이지 안에서 같은 키워드가 반복되면 처음 나온 것만 사용.
+    """
+    seen = set(snapshot.index)
+    new_rows = []
     for keyword, a_txt, c_txt in pr_data:
-        if not keyword_exists(sheets, keyword):
-            row = get_first_empty_row(sheets, 'B')
-            add_to_sheet(sheets, keyword, a_txt, c_txt, row)
-            time.sleep(0.5)
-    print("완료")
+        if keyword in seen:
+            continue
+        seen.add(keyword)
+        new_rows.append((keyword, a_txt, c_txt))
+    return new_rows
+
+def get_empty_rows(snapshot, count):
+    """B열이 비어 있는 행 번호를 위에서부터 count개 반환 (중간 빈 행 먼저, 그다음 마지막 행 뒤)."""
+    rows = [row for row, _ in snapshot.records() if not snapshot.cell(row, 'B').strip()][:count]
+    next_row = len(snapshot.rows) + 1
+    while len(rows) < count:
+        rows.append(next_row)
+        next_row += 1
+    return rows
+
+def add_new_pr_rows(snapshot, writer, pr_data):
+    """
+    시트에 없는 PR 키워드를 빈 행에 채우도록 writer에 추가하고, 스냅샷에도 반영.
+    추가한 행 수를 반환.
+    """
+    new_rows = get_new_pr_rows(snapshot, pr_data)
+    print(f"위키 PR 링크 {len(pr_data)}개 중 새 키워드 {len(new_rows)}개")
+    for (keyword, a_txt, c_txt), row in zip(new_rows, get_empty_rows(snapshot, len(new_rows))):
+        writer.add_range(keyword, f"A{row}:C{row}", [[a_txt or '', keyword, c_txt or '']])
+        snapshot.set_cell(row, 'B', keyword)
+        snapshot.set_cell(row, 'C', c_txt or '')
+    return len(new_rows)
+
+def sync_pr_rows(sheets, snapshot, pr_data):
+    """시트에 없는 PR 키워드를 batchUpdate 한 번으로 기록. (성공 수, 실패 수) 반환."""
+    writer = SheetWriteBuffer(sheets, SPREADSHEET_ID)
+    if not add_new_pr_rows(snapshot, writer, pr_data):
+        return 0, 0
+    return writer.flush()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="위키 PR 링크를 시트에 동기화")
+    cassette.add_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_metrics.install("wiki")
+    cassette.from_args(args)
+    creds = get_credentials()
+    sheets = ga_client.get_sheets_service(creds)
+    with run_metrics.tagged(stage="wiki"):
+        pr_data = get_wiki_pr_data()
+    snapshot = SheetSnapshot.load(sheets, SPREADSHEET_ID, "B:B")
+    success_count, fail_count = sync_pr_rows(sheets, snapshot, pr_data)
+    print(f"완료 (추가: {success_count}, 실패: {fail_count})")
+    if fail_count > 0:
+        exit(1)
 
 if __name__ == '__main__':
     main()
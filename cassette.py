@@ -0,0 +1,263 @@
+"""
+GA / 시트 / 위키 HTTP 요청 녹화(--record DIR)와 재생(--replay DIR).
+
+  - 녹화: googleapiclient 요청(httplib2)과 위키 requests 요청의 응답을
+    DIR/<종류>/<요청 키>.json.gz 로 저장한다. 요청 키는 메서드 + 경로/쿼리 + 본문(JSON은 키 정렬)의 해시.
+  - 재생: 같은 요청이면 디스크의 응답을 그대로 돌려주고 네트워크는 전혀 쓰지 않는다.
+    인증 정보도 읽지 않으며, 녹화에 없는 요청은 CassetteMissError.
+
+재생 결과가 녹화 때와 같도록 실행 시각(now())과 로컬 상태 파일(일자별 저장소, 위키 캐시)도
+녹화 시작 시점 것을 DIR/meta.json, DIR/state/에 함께 저장해 두고 재생 때 복사본으로 쓴다.
+녹화/재생 중에는 GA 리포트 로컬 캐시를 끈다.
+requests는 위키 스크립트만 쓰므로 GA 스크립트의 시작 시간을 늘리지 않게 http_adapter()에서 import 한다.
+"""
+import base64
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import report_cache
+
+RECORD = "record"
+REPLAY = "replay"
+
+# 요청 키에서 뺄 쿼리 파라미터 (인증 관련)
+IGNORED_PARAMS = {"access_token", "key"}
+
+_mode = None
+_directory = None
+_recorded_at = None
+_state_paths = {}
+_replay_state_dir = None
+_lock = threading.Lock()
+
+
+class CassetteMissError(RuntimeError):
+    """재생 중 녹화에 없는 요청을 보냈을 때."""
+
+
+def add_arguments(parser):
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="DIR", help="GA/시트/위키 요청과 응답을 DIR에 녹화")
+    group.add_argument("--replay", metavar="DIR", help="DIR에 녹화한 응답으로 네트워크 없이 재실행")
+
+
+def from_args(args):
+    """parse_args 결과의 --record / --replay를 적용."""
+    configure(record_dir=getattr(args, "record", None), replay_dir=getattr(args, "replay", None))
+
+
+def configure(record_dir=None, replay_dir=None):
+    global _mode, _directory, _recorded_at
+    if record_dir:
+        _mode, _directory = RECORD, record_dir
+        os.makedirs(record_dir, exist_ok=True)
+        _recorded_at = datetime.now()
+        with open(os.path.join(record_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"recorded_at": _recorded_at.isoformat(), "argv": sys.argv}, f, ensure_ascii=False)
+        print(f"요청 녹화: {record_dir}")
+    elif replay_dir:
+        _mode, _directory = REPLAY, replay_dir
+        with open(os.path.join(replay_dir, "meta.json"), encoding="utf-8") as f:
+            _recorded_at = datetime.fromisoformat(json.load(f)["recorded_at"])
+        print(f"녹화 재생: {replay_dir} (녹화 시각 {_recorded_at:%Y-%m-%d %H:%M})")
+    else:
+        return
+    report_cache.set_enabled(False)
+
+
+def is_recording():
+    return _mode == RECORD
+
+
+def is_replaying():
+    return _mode == REPLAY
+
+
+def now():
+    """현재 시각. 재생 중이면 녹화 시작 시각."""
+    return _recorded_at if _mode == REPLAY else datetime.now()
+
+
+def state_path(name, path):
+    """
+    로컬 상태 파일 경로. 녹화 중이면 처음 쓰기 전에 DIR/state/name으로 복사해 두고,
+    재생 중이면 그 복사본을 임시 폴더에 다시 복사해서 그 경로를 돌려준다 (녹화 폴더는 바뀌지 않음).
+    """
+    global _replay_state_dir
+    if _mode is None:
+        return path
+    with _lock:
+        if name in _state_paths:
+            return _state_paths[name]
+        saved = os.path.join(_directory, "state", name)
+        if _mode == RECORD:
+            os.makedirs(os.path.dirname(saved), exist_ok=True)
+            if os.path.exists(path):
+                shutil.copy2(path, saved)
+            elif os.path.exists(saved):
+                os.remove(saved)
+            resolved = path
+        else:
+            if _replay_state_dir is None:
+                _replay_state_dir = tempfile.mkdtemp(prefix="cassette_state_")
+            resolved = os.path.join(_replay_state_dir, name)
+            if os.path.exists(saved):
+                shutil.copy2(saved, resolved)
+        _state_paths[name] = resolved
+        return resolved
+
+
+def _canonical_body(body):
+    if body is None or body == b"" or body == "":
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        return json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    except ValueError:
+        return body
+
+
+def _canonical_uri(uri):
+    """요청 키용 URL. 호스트는 빼고(주소를 바꿔 녹화해도 재생되도록) 쿼리는 정렬한다."""
+    parts = urlsplit(uri)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    return urlunsplit(("", "", parts.path, urlencode(query), ""))
+
+
+def request_key(method, uri, body):
+    raw = json.dumps([method.upper(), _canonical_uri(uri), _canonical_body(body)], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _path(kind, key):
+    return os.path.join(_directory, kind, f"{key}.json.gz")
+
+
+def save(kind, method, uri, body, status, headers, content):
+    key = request_key(method, uri, body)
+    entry = {
+        "method": method.upper(),
+        "uri": _canonical_uri(uri),
+        "body": _canonical_body(body),
+        "status": status,
+        "headers": {k.lower(): v for k, v in headers.items() if k.lower() in ("content-type", "etag")},
+    }
+    try:
+        entry["content"] = content.decode("utf-8")
+    except UnicodeDecodeError:
+        entry["content_b64"] = base64.b64encode(content).decode("ascii")
+
+    path = _path(kind, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with gzip.GzipFile(tmp_path, "wb", mtime=0) as f:
+        f.write(json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+    os.replace(tmp_path, path)
+
+
+def load(kind, method, uri, body):
+    """녹화된 (상태 코드, 헤더, 본문 bytes). 없으면 CassetteMissError."""
+    path = _path(kind, request_key(method, uri, body))
+    try:
+        with gzip.open(path, "rb") as f:
+            entry = json.loads(f.read())
+    except FileNotFoundError:
+        raise CassetteMissError(f"녹화에 없는 요청: {method} {_canonical_uri(uri)}") from None
+    if "content_b64" in entry:
+        content = base64.b64decode(entry["content_b64"])
+    else:
+        content = entry["content"].encode("utf-8")
+    return entry["status"], entry["headers"], content
+
+
+class RecordingHttp:
+    """googleapiclient용 http 래퍼. 요청은 그대로 보내고 응답을 녹화한다."""
+
+    def __init__(self, http, kind="google"):
+        self.http = http
+        self.kind = kind
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        response, content = self.http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        save(self.kind, method, uri, body, response.status, dict(response), content)
+        return response, content
+
+    def __getattr__(self, name):
+        return getattr(self.http, name)
+
+
+class ReplayHttp:
+    """googleapiclient용 http 대체. 녹화된 응답만 돌려준다."""
+
+    def __init__(self, kind="google"):
+        self.kind = kind
+        self.timeout = None
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        import httplib2
+
+        status, headers, content = load(self.kind, method, uri, body)
+        return httplib2.Response(dict(headers, status=str(status))), content
+
+    def close(self):
+        pass
+
+
+_adapter_class = None
+
+
+def _cassette_adapter_class():
+    """requests용 CassetteAdapter 클래스. 처음 필요할 때 requests를 import 해서 만든다."""
+    global _adapter_class
+    if _adapter_class is not None:
+        return _adapter_class
+
+    import requests
+    from requests.adapters import HTTPAdapter
+    from requests.structures import CaseInsensitiveDict
+
+    class CassetteAdapter(HTTPAdapter):
+        """녹화 중이면 응답을 저장하고, 재생 중이면 디스크의 응답을 돌려준다."""
+
+        def __init__(self, kind="wiki", **kwargs):
+            self.kind = kind
+            super().__init__(**kwargs)
+
+        def send(self, request, **kwargs):
+            if _mode == REPLAY:
+                status, headers, content = load(self.kind, request.method, request.url, request.body)
+                response = requests.Response()
+                response.status_code = status
+                response.headers = CaseInsensitiveDict(headers)
+                response._content = content
+                response.encoding = "utf-8"
+                response.url = request.url
+                response.request = request
+                return response
+
+            response = super().send(request, **kwargs)
+            if _mode == RECORD:
+                save(self.kind, request.method, request.url, request.body,
+                     response.status_code, response.headers, response.content)
+            return response
+
+    _adapter_class = CassetteAdapter
+    return _adapter_class
+
+
+def http_adapter(**kwargs):
+    """requests.Session에 mount할 어댑터 (녹화/재생 중이면 CassetteAdapter)."""
+    if _mode:
+        return _cassette_adapter_class()(**kwargs)
+    from requests.adapters import HTTPAdapter
+
+    return HTTPAdapter(**kwargs)
@@ -0,0 +1,166 @@
+"""
+일자별 클릭 수 로컬 저장소 (SQLite).
+
+(property, dimension, 값, 날짜) 단위로 클릭 수를 저장해 두고,
+매 실행마다 마지막으로 확정된 날짜 이후만 GA에서 date 차원으로 받아 갱신한다.
+시트에 쓰는 누적값은 저장된 일자별 값의 합(prefix sum + 새 날짜)이다.
+"""
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import cassette
+import ga_reports
+
+STORE_PATH = os.getenv("GA_DAILY_STORE_PATH", "./ga_daily_clicks.sqlite3")
+
+# GA 데이터는 며칠간 계속 보정되므로, 최근 N일은 확정하지 않고 다음 실행 때 다시 받는다.
+SETTLE_DAYS = 3
+
+
+class DailyClickStore:
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS daily_clicks (
+                property_id TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                day TEXT NOT NULL,
+                clicks INTEGER NOT NULL,
+                PRIMARY KEY (property_id, dimension, value, day)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                property_id TEXT NOT NULL,
+                dimension TEXT NOT NULL,
+                synced_through TEXT NOT NULL,
+                PRIMARY KEY (property_id, dimension)
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def synced_through(self, property_id, dimension):
+        """확정 저장된 마지막 날짜(YYYY-MM-DD). 없으면 None."""
+        row = self.conn.execute(
+            "SELECT synced_through FROM sync_state WHERE property_id = ? AND dimension = ?",
+            (property_id, dimension)
+        ).fetchone()
+        return row[0] if row else None
+
+    def replace_days(self, property_id, dimension, start_date, end_date, daily, synced_through, clear_all=False):
+        """
+        start_date ~ end_date 구간(clear_all이면 전체)의 저장값을 daily로 교체하고 확정일을 갱신.
+        daily는 (값, 날짜, 클릭 수) 이터러블이며 한 트랜잭션 안에서 스트리밍으로 넣는다.
+        """
+        with self.conn:
+            if clear_all:
+                self.conn.execute(
+                    "DELETE FROM daily_clicks WHERE property_id = ? AND dimension = ?",
+                    (property_id, dimension)
+                )
+            else:
+                self.conn.execute(
+                    "DELETE FROM daily_clicks WHERE property_id = ? AND dimension = ? AND day BETWEEN ? AND ?",
+                    (property_id, dimension, start_date, end_date)
+                )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO daily_clicks (property_id, dimension, value, day, clicks) VALUES (?, ?, ?, ?, ?)",
+                ((property_id, dimension, value, day, clicks) for value, day, clicks in daily)
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (property_id, dimension, synced_through) VALUES (?, ?, ?)",
+                (property_id, dimension, synced_through)
+            )
+
+    def clear(self, property_id, dimension):
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM daily_clicks WHERE property_id = ? AND dimension = ?",
+                (property_id, dimension)
+            )
+            self.conn.execute(
+                "DELETE FROM sync_state WHERE property_id = ? AND dimension = ?",
+                (property_id, dimension)
+            )
+
+    def totals(self, property_id, dimension, end_date=None):
+        """end_date까지의 누적 클릭 수를 소문자 값 → 클릭 수 딕셔너리로 반환."""
+        query = "SELECT value, SUM(clicks) FROM daily_clicks WHERE property_id = ? AND dimension = ?"
+        params = [property_id, dimension]
+        if end_date:
+            query += " AND day <= ?"
+            params.append(end_date)
+        query += " GROUP BY value"
+
+        totals = {}
+        for value, clicks in self.conn.execute(query, params):
+            key = value.lower()
+            totals[key] = totals.get(key, 0) + clicks
+        return totals
+
+
+def _fetch_start(synced, full_rebuild):
+    """GA에서 다시 받아야 하는 첫 날짜."""
+    if full_rebuild or synced is None:
+        return ga_reports.START_DATE
+    return (datetime.strptime(synced, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def plan_daily_report(property_id, dimension, end_date, full_rebuild=False, store_path=STORE_PATH):
+    """
+    get_cumulative_clicks가 보낼 일자별 리포트 본문. 저장소가 end_date까지 확정돼 있어 조회가 필요 없으면 None.
+    (report_planner가 미리 batchRunReports로 받아 두는 용도)
+    """
+    store = DailyClickStore(cassette.state_path("ga_daily_clicks.sqlite3", store_path))
+    try:
+        fetch_start = _fetch_start(store.synced_through(property_id, dimension), full_rebuild)
+    finally:
+        store.close()
+    if fetch_start > end_date:
+        return None
+    return ga_reports.click_report_body(dimension, fetch_start, end_date, by_date=True)
+
+
+def get_cumulative_clicks(property_id, dimension, end_date, full_rebuild=False, store_path=STORE_PATH, limiter=None):
+    """
+    START_DATE ~ end_date 누적 클릭 수(소문자 값 → 클릭 수)를 반환.
+    저장소에 확정된 날짜 이후만 GA에서 받아 오고, full_rebuild면 전체 기간을 다시 받아 저장소를 맞춘다.
+    """
+    store = DailyClickStore(cassette.state_path("ga_daily_clicks.sqlite3", store_path))
+    try:
+        synced = store.synced_through(property_id, dimension)
+        previous = None
+        if full_rebuild and synced is not None:
+            previous = store.totals(property_id, dimension)
+        fetch_start = _fetch_start(synced, full_rebuild)
+
+        if fetch_start <= end_date:
+            print(f"[{dimension}] GA 일자별 데이터 조회: {fetch_start} ~ {end_date}")
+            daily = ga_reports.iter_daily_clicks(property_id, dimension, fetch_start, end_date, limiter=limiter)
+
+            settled = (cassette.now() - timedelta(days=SETTLE_DAYS)).strftime("%Y-%m-%d")
+            rebuild = full_rebuild or synced is None
+            new_synced = min(settled, end_date) if rebuild else max(min(settled, end_date), synced)
+            store.replace_days(
+                property_id, dimension, fetch_start, end_date, daily, new_synced, clear_all=rebuild
+            )
+        else:
+            print(f"[{dimension}] 저장소가 {synced}까지 확정되어 있어 GA 조회를 생략합니다.")
+
+        totals = store.totals(property_id, dimension, end_date)
+
+        if previous is not None:
+            changed = sorted(
+                value for value in set(previous) | set(totals)
+                if previous.get(value, 0) != totals.get(value, 0)
+            )
+            print(f"[{dimension}] 전체 재구축: 누적값이 달라진 항목 {len(changed)}개")
+            for value in changed[:20]:
+                print(f"  {value}: {previous.get(value, 0)} → {totals.get(value, 0)}")
+
+        return totals
+    finally:
+        store.close()
@@ -0,0 +1,207 @@
+"""
+GA Data API / Sheets API 공용 클라이언트.
+
+인증 정보는 프로세스당 한 번만 로드(필요 시 갱신)하고, 서비스 객체는
+메모이즈해서 재사용한다. 서비스마다 하나의 httplib2.Http를 물려 두므로
+같은 호스트로 가는 요청은 keep-alive 연결을 그대로 재사용한다.
+httplib2.Http는 스레드 안전하지 않으므로 서비스 캐시는 스레드별로 둔다.
+
+시작 시간을 줄이려고
+  - google 클라이언트 라이브러리는 처음 인증/서비스를 만들 때 import 하고,
+    브라우저 인증(google_auth_oauthlib)은 실제로 새 인증이 필요할 때만 import 한다 (CI에서는 쓰지 않음).
+  - 서비스는 discovery/ 에 고정해 둔 discovery 문서(analyticsdata v1beta, sheets v4)로 만든다.
+    문서는 프로세스당 한 번만 읽어 파싱하고, 파일이 없으면 라이브러리 내장 문서로 build()한다.
+    (문서 갱신: google-api-python-client의 googleapiclient/discovery_cache/documents/에서 같은 파일을 복사)
+"""
+import json
+import os
+import threading
+
+import cassette
+
+SCOPES = [
+    'https://www.googleapis.com/auth/analytics.readonly',
+    'https://www.googleapis.com/auth/spreadsheets'
+]
+
+CLIENT_SECRET_FILE = os.getenv("GA_CLIENT_SECRET_PATH", "./client_secret.json")
+TOKEN_FILE = os.getenv("GA_TOKEN_PATH", "./ga_token.json")
+
+# API 요청 타임아웃(초)
+HTTP_TIMEOUT = 60
+
+# API 주소 재지정 (벤치마크용 로컬 가짜 서버 등). 비어 있으면 기본 Google 주소
+API_ENDPOINT_ENV = {
+    'analyticsdata': 'GA_API_ENDPOINT',
+    'sheets': 'SHEETS_API_ENDPOINT',
+}
+
+# 고정 discovery 문서 폴더 ({name}.{version}.json)
+DISCOVERY_DIR = os.getenv(
+    "GA_DISCOVERY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "discovery")
+)
+
+_credentials_cache = {}
+_credentials_lock = threading.Lock()
+_documents = {}
+_documents_lock = threading.Lock()
+_local = threading.local()
+
+
+def _run_installed_app_flow(client_secret_file, scopes):
+    """브라우저 인증. google_auth_oauthlib는 여기서만 필요하므로 이때 import 한다."""
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
+    flow = InstalledAppFlow.from_client_secrets_file(client_secret_file, scopes)
+    return flow.run_local_server(port=0)
+
+
+def _load_credentials(token_file, client_secret_file, scopes):
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+
+    creds = None
+
+    # 토큰 파일이 존재하면 로드
+    if os.path.exists(token_file):
+        try:
+            creds = Credentials.from_authorized_user_file(token_file, scopes)
+            print("기존 토큰 파일에서 인증 정보를 로드했습니다.")
+        except Exception as e:
+            print(f"토큰 파일 로드 중 오류: {e}")
+            if os.path.exists(token_file):
+                os.remove(token_file)
+                print("손상된 토큰 파일을 삭제했습니다.")
+
+    # 토큰이 없거나 유효하지 않은 경우
+    if not creds or not creds.valid:
+        if creds and creds.expired and creds.refresh_token:
+            try:
+                print("토큰이 만료되었습니다. 갱신을 시도합니다...")
+                creds.refresh(Request())
+                print("토큰 갱신이 완료되었습니다.")
+            except Exception as e:
+                print(f"토큰 갱신 실패: {e}")
+                if os.path.exists(token_file):
+                    os.remove(token_file)
+                    print("만료된 토큰 파일을 삭제했습니다.")
+
+                # CI 환경 체크
+                if os.getenv("GITHUB_ACTIONS") == "true":
+                    raise RuntimeError(
+                        "GA_TOKEN_JSON secret 업데이트 필요: 토큰 갱신에 실패했습니다."
+                    )
+
+                creds = _run_installed_app_flow(client_secret_file, scopes)
+                print("새로운 인증이 완료되었습니다.")
+        else:
+            print("새로운 인증을 시작합니다...")
+
+            if os.getenv("GITHUB_ACTIONS") == "true":
+                raise RuntimeError(
+                    "GA_TOKEN_JSON secret 필요: Actions에서는 브라우저 인증(InstalledAppFlow)을 사용할 수 없습니다."
+                )
+
+            creds = _run_installed_app_flow(client_secret_file, scopes)
+            print("인증이 완료되었습니다.")
+
+        # 토큰 저장
+        try:
+            with open(token_file, 'w') as token:
+                token.write(creds.to_json())
+            print(f"토큰이 {token_file}에 저장되었습니다.")
+        except Exception as e:
+            print(f"토큰 저장 중 오류: {e}")
+
+    return creds
+
+
+def get_credentials(token_file=None, client_secret_file=None, scopes=None):
+    """
+    토큰 파일 + 갱신 + CI 체크. 같은 토큰 파일/스코프 조합은 프로세스당 한 번만 로드한다.
+    """
+    if cassette.is_replaying():
+        # 재생 중에는 인증 정보(토큰 갱신 포함)를 쓰지 않음
+        return None
+
+    token_file = token_file or TOKEN_FILE
+    client_secret_file = client_secret_file or CLIENT_SECRET_FILE
+    scopes = list(scopes or SCOPES)
+    key = (token_file, tuple(scopes))
+
+    with _credentials_lock:
+        creds = _credentials_cache.get(key)
+        if creds is None:
+            creds = _load_credentials(token_file, client_secret_file, scopes)
+            _credentials_cache[key] = creds
+        elif not creds.valid and creds.refresh_token:
+            from google.auth.transport.requests import Request
+
+            # 장시간 실행 중 만료된 경우 메모리상의 토큰만 갱신
+            creds.refresh(Request())
+        return creds
+
+
+def discovery_document(name, version):
+    """고정 discovery 문서(파싱된 딕셔너리). 파일이 없으면 None. 프로세스당 한 번만 읽는다."""
+    key = (name, version)
+    with _documents_lock:
+        if key not in _documents:
+            path = os.path.join(DISCOVERY_DIR, f"{name}.{version}.json")
+            try:
+                with open(path, encoding="utf-8") as f:
+                    _documents[key] = json.load(f)
+            except FileNotFoundError:
+                _documents[key] = None
+        return _documents[key]
+
+
+def _build(name, version, http, client_options):
+    from googleapiclient.discovery import build, build_from_document
+
+    document = discovery_document(name, version)
+    if document is None:
+        return build(name, version, http=http, cache_discovery=False, static_discovery=True,
+                     client_options=client_options)
+    return build_from_document(document, http=http, client_options=client_options)
+
+
+def get_service(name, version, credentials=None):
+    """
+    (name, version) 서비스 객체를 스레드별로 메모이즈해서 반환.
+    각 서비스는 keep-alive 연결을 유지하는 전용 httplib2.Http를 사용한다.
+    """
+    if credentials is None and not cassette.is_replaying():
+        credentials = get_credentials()
+
+    services = getattr(_local, 'services', None)
+    if services is None:
+        services = _local.services = {}
+
+    key = (name, version, id(credentials))
+    service = services.get(key)
+    if service is None:
+        if cassette.is_replaying():
+            http = cassette.ReplayHttp()
+        else:
+            import google_auth_httplib2
+            import httplib2
+
+            http = google_auth_httplib2.AuthorizedHttp(
+                credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT)
+            )
+            if cassette.is_recording():
+                http = cassette.RecordingHttp(http)
+        endpoint = os.getenv(API_ENDPOINT_ENV.get(name, ''), '')
+        client_options = {'api_endpoint': endpoint} if endpoint else None
+        service = _build(name, version, http, client_options)
+        services[key] = service
+    return service
+
+
+def get_analytics_service(credentials=None):
+    return get_service('analyticsdata', 'v1beta', credentials)
+
+
+def get_sheets_service(credentials=None):
+    return get_service('sheets', 'v4', credentials)
@@ -0,0 +1,127 @@
+"""
+검색어별 runReport를 동시에 보내는 실행기.
+
+- 스레드 풀로 최대 max_workers개까지 동시에 요청 (스레드마다 ga_client의 전용 서비스 사용)
+- 토큰 버킷(QuotaLimiter)으로 시간당 property 토큰 한도 아래에서만 요청을 내보냄.
+  버킷은 returnPropertyQuota로 받은 propertyQuota(요청별 소모량, 남은 양)로 계속 보정한다.
+- 429 / RESOURCE_EXHAUSTED는 지수 백오프 후 재시도
+- 응답 행은 페이지 단위로 받아 바로 합산 (전체 응답을 메모리에 쌓지 않음)
+- 결과는 입력 순서 그대로 반환 (시트 기록 순서가 매번 같도록)
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from googleapiclient.errors import HttpError
+
+import ga_reports
+import run_metrics
+
+# 표준 property 기준 "프로젝트별 property 시간당 토큰" 한도
+TOKENS_PER_HOUR = 14000
+
+# 한도의 이 비율까지만 사용
+SAFETY_RATIO = 0.9
+
+# 동시 요청 수 기본값 (GA 동시 요청 한도는 property당 10)
+DEFAULT_CONCURRENCY = 4
+
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+class QuotaLimiter:
+    """시간당 토큰 한도를 초당 보충 속도로 나눈 토큰 버킷."""
+
+    def __init__(self, tokens_per_hour=TOKENS_PER_HOUR, safety_ratio=SAFETY_RATIO, initial_cost=10):
+        self.capacity = tokens_per_hour * safety_ratio
+        self.rate = self.capacity / 3600.0
+        self.tokens = self.capacity
+        self.cost = float(initial_cost)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """요청 1건의 예상 토큰이 모일 때까지 기다렸다가 차감."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= self.cost:
+                    self.tokens -= self.cost
+                    return
+                wait = (self.cost - self.tokens) / self.rate
+            time.sleep(min(wait, BACKOFF_MAX))
+
+    def update(self, property_quota):
+        """응답의 propertyQuota로 요청당 소모량과 남은 토큰을 보정."""
+        if not property_quota:
+            return
+        hourly = property_quota.get('tokensPerProjectPerHour') or property_quota.get('tokensPerHour')
+        if not hourly:
+            return
+        with self.lock:
+            consumed = hourly.get('consumed')
+            if consumed:
+                # 요청당 소모량은 이동 평균으로 추정
+                self.cost = self.cost * 0.7 + float(consumed) * 0.3
+            remaining = hourly.get('remaining')
+            if remaining is not None:
+                self._refill(time.monotonic())
+                self.tokens = min(self.tokens, float(remaining) * SAFETY_RATIO)
+
+    def drain(self):
+        """429를 받으면 다른 스레드도 함께 쉬도록 버킷을 비움."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, 0.0)
+
+    def call(self, request_fn):
+        """토큰을 받은 뒤 request_fn()을 실행하고, 429면 백오프 후 재시도."""
+        for attempt in range(MAX_RETRIES + 1):
+            self.acquire()
+            try:
+                response = request_fn()
+            except HttpError as e:
+                if not is_rate_limited(e) or attempt == MAX_RETRIES:
+                    raise
+                self.drain()
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * (0.5 + random.random() / 2)
+                print(f"GA 한도 초과(429), {delay:.1f}초 후 재시도합니다... ({attempt + 1}/{MAX_RETRIES})")
+                time.sleep(delay)
+                continue
+            self.update(response.get('propertyQuota'))
+            return response
+
+
+def is_rate_limited(error):
+    return isinstance(error, HttpError) and error.resp.status in (429, 503)
+
+
+def run_reports_concurrently(property_id, items, make_body, max_workers=DEFAULT_CONCURRENCY, limiter=None,
+                             label="검색어", reduce_rows=ga_reports.sum_event_counts):
+    """
+    items마다 make_body(item)로 만든 runReport를 동시에 실행해서 items 순서대로 결과 리스트를 반환.
+    응답 행은 페이지 단위로 스트리밍해서 reduce_rows(행 이터레이터)로 줄인 값만 남긴다
+    (기본: eventCount 합계). 실패한 항목의 결과는 None.
+    """
+    limiter = limiter or QuotaLimiter()
+    tags = run_metrics.current_tags()
+
+    def fetch(item):
+        body = make_body(item)
+        try:
+            with run_metrics.tagged(**dict(tags, label=item)):
+                return reduce_rows(ga_reports.iter_report_rows(property_id, body, limiter=limiter))
+        except Exception as e:
+            print(f"{label} '{item}'에 대한 데이터 조회 중 오류: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        return list(executor.map(fetch, items))
@@ -0,0 +1,209 @@
+"""
+GA4 클릭 리포트 공용 헬퍼.
+
+세 스크립트가 공통으로 쓰는 "eventName = click" 리포트의 요청 본문 생성,
+offset 페이지 처리(행 단위 스트리밍), 값별/일자별 합산을 모아 둔다.
+"""
+import os
+import threading
+
+import report_cache
+import run_metrics
+from ga_client import get_analytics_service
+
+# 누적 집계 시작일
+START_DATE = "2025-02-01"
+
+# 한 페이지에 받을 행 수 (runReport 최대 250,000)
+PAGE_SIZE = int(os.getenv("GA_REPORT_PAGE_SIZE", "100000"))
+
+# runRealtimeReport로 볼 수 있는 최근 분 수 (표준 property 30분)
+REALTIME_MINUTES = 30
+
+# report_planner가 미리 받아 둔 응답 (캐시 키 → runReport 응답)
+_prefetched = {}
+_prefetched_lock = threading.Lock()
+
+
+def click_report_body(dimension, start_date, end_date, values=None, by_date=False,
+                      extra_filters=None, event_name="click"):
+    """
+    eventName = click 인 이벤트 수를 dimension 기준으로 묶는 runReport 요청 본문.
+      - values: 주어지면 dimension 값을 inListFilter로 제한 (대소문자 무시, GA EXACT와 동일)
+      - by_date: True면 date 차원을 추가해서 일자별로 나눔
+      - extra_filters: andGroup에 덧붙일 GA FilterExpression 리스트
+    """
+    expressions = [
+        {
+            "filter": {
+                "fieldName": "eventName",
+                "stringFilter": {
+                    "matchType": "EXACT",
+                    "value": event_name
+                }
+            }
+        }
+    ]
+    expressions.extend(extra_filters or [])
+    if values is not None:
+        expressions.append({
+            "filter": {
+                "fieldName": dimension,
+                "inListFilter": {
+                    "values": sorted(set(values)),
+                    "caseSensitive": False
+                }
+            }
+        })
+
+    dimensions = [{"name": dimension}]
+    if by_date:
+        dimensions.append({"name": "date"})
+
+    return {
+        "dateRanges": [
+            {"startDate": start_date, "endDate": end_date}
+        ],
+        "metrics": [
+            {"name": "eventCount"}
+        ],
+        "dimensions": dimensions,
+        "dimensionFilter": {
+            "andGroup": {
+                "expressions": expressions
+            }
+        }
+    }
+
+
+def realtime_click_report_body(dimension, values=None, extra_filters=None, event_name="click",
+                               minutes=REALTIME_MINUTES):
+    """
+    최근 minutes분의 click 이벤트 수를 (dimension 값, minutesAgo)로 묶는 runRealtimeReport 요청 본문.
+    dimension은 실시간 리포트에서 지원하는 차원이어야 한다.
+    """
+    body = click_report_body(dimension, None, None, values=values,
+                             extra_filters=extra_filters, event_name=event_name)
+    del body["dateRanges"]
+    body["dimensions"].append({"name": "minutesAgo"})
+    body["minuteRanges"] = [{"startMinutesAgo": minutes - 1, "endMinutesAgo": 0}]
+    body["limit"] = PAGE_SIZE
+    return body
+
+
+def run_realtime_report(property_id, body, limiter=None):
+    """runRealtimeReport 한 번 (로컬 캐시 없음). limiter가 있으면 토큰 한도/429 재시도를 거친다."""
+    target = f"properties/{property_id}"
+    with run_metrics.timed("ga", "runRealtimeReport", target) as call:
+        def request():
+            with call.attempt():
+                return get_analytics_service().properties().runRealtimeReport(
+                    property=target,
+                    body=dict(body, returnPropertyQuota=True)
+                ).execute()
+
+        response = limiter.call(request) if limiter else request()
+        call.set_response(response)
+        return response
+
+
+def page_body(body, offset=0, page_size=None):
+    """iter_report_rows가 실제로 보내는 페이지 요청 본문."""
+    return dict(body, offset=offset, limit=page_size or body.get("limit") or PAGE_SIZE)
+
+
+def prefetch(property_id, body, response):
+    """report_planner가 batchRunReports로 미리 받은 응답을 run_report가 돌려주도록 등록."""
+    with _prefetched_lock:
+        _prefetched[report_cache.cache_key(property_id, body)] = response
+
+
+def clear_prefetched():
+    with _prefetched_lock:
+        _prefetched.clear()
+
+
+def run_report(property_id, body, limiter=None):
+    """
+    runReport 한 번. 플래너가 미리 받아 둔 응답이나 report_cache의 로컬 캐시에 있으면 그대로 돌려준다.
+    limiter(ga_executor.QuotaLimiter)가 주어지면 토큰 한도/429 재시도를 거쳐 요청한다.
+    실제 요청은 run_metrics에 소요 시간/재시도/propertyQuota와 함께 기록한다.
+    """
+    target = f"properties/{property_id}"
+    with _prefetched_lock:
+        response = _prefetched.get(report_cache.cache_key(property_id, body))
+    if response is not None:
+        run_metrics.record_cache_hit("ga", "runReport", target)
+        return response
+
+    fetched = []
+
+    def fetch():
+        fetched.append(True)
+        with run_metrics.timed("ga", "runReport", target) as call:
+            def request():
+                with call.attempt():
+                    # 토큰 소모량 기록용으로 propertyQuota도 받음 (캐시 키에는 넣지 않음)
+                    return get_analytics_service().properties().runReport(
+                        property=target,
+                        body=dict(body, returnPropertyQuota=True)
+                    ).execute()
+
+            response = limiter.call(request) if limiter else request()
+            call.set_response(response)
+            return response
+
+    response = report_cache.cached_call(property_id, body, fetch)
+    if not fetched:
+        run_metrics.record_cache_hit("ga", "runReport", target)
+    return response
+
+
+def iter_report_rows(property_id, body, page_size=None, limiter=None):
+    """
+    runReport 결과 행을 한 페이지씩 받아 차례로 yield 하는 제너레이터.
+    offset/limit으로 rowCount를 다 받을 때까지 다음 페이지를 요청하며,
+    한 번에 한 페이지만 메모리에 둔다.
+    """
+    offset = 0
+    while True:
+        response = run_report(property_id, page_body(body, offset, page_size), limiter=limiter)
+        page = response.get('rows', [])
+        row_count = response.get('rowCount', 0)
+        del response
+
+        yield from page
+        offset += len(page)
+        if not page or offset >= row_count:
+            return
+
+
+def sum_event_counts(rows):
+    """행들의 첫 번째 측정값(eventCount) 합계."""
+    return sum(int(row['metricValues'][0]['value']) for row in rows)
+
+
+def fetch_clicks(property_id, dimension, start_date, end_date, values=None,
+                 extra_filters=None, event_name="click", limiter=None):
+    """기간 전체 클릭 수를 소문자 dimension 값 → 클릭 수 딕셔너리로 반환."""
+    body = click_report_body(dimension, start_date, end_date, values=values,
+                             extra_filters=extra_filters, event_name=event_name)
+    clicks = {}
+    for row in iter_report_rows(property_id, body, limiter=limiter):
+        value = row['dimensionValues'][0]['value'].lower()
+        clicks[value] = clicks.get(value, 0) + int(row['metricValues'][0]['value'])
+    return clicks
+
+
+def iter_daily_clicks(property_id, dimension, start_date, end_date, values=None,
+                      extra_filters=None, event_name="click", limiter=None):
+    """
+    기간 내 (dimension 값, 날짜 YYYY-MM-DD, 클릭 수)를 차례로 yield.
+    dimension 값은 GA가 돌려준 그대로 둔다.
+    """
+    body = click_report_body(dimension, start_date, end_date, values=values, by_date=True,
+                             extra_filters=extra_filters, event_name=event_name)
+    for row in iter_report_rows(property_id, body, limiter=limiter):
+        value = row['dimensionValues'][0]['value']
+        day = row['dimensionValues'][1]['value']
+        yield value, f"{day[:4]}-{day[4:6]}-{day[6:]}", int(row['metricValues'][0]['value'])
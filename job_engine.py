@@ -0,0 +1,325 @@
+"""
+설정 파일(jobs.json) 기반 클릭 집계 작업 실행기.
+
+작업 하나 = (GA property, 시트, 키 열, dimension, 필터, 보정값).
+시트의 키 열 값마다 누적 클릭 수를 계산해서 오늘 날짜 열에 기록한다.
+
+property마다 워커 프로세스 하나를 두고, 그 안에서 해당 property 작업들의 리포트를 batchRunReports로
+묶어 받은 뒤(report_planner) 작업을 설정 순서대로 실행한다.
+토큰 한도(QuotaLimiter)는 property별로 따로 두므로, 한 property가 느리거나 한도에 걸려도
+다른 property 작업은 그대로 진행되고 끝나는 대로 결과를 출력한다.
+같은 셀에 여러 작업이 쓰면 설정 파일에서 뒤에 있는 작업 값이 남는다 (같은 property 작업끼리).
+
+설정 예 (jobs.json):
+  {
+    "defaults": {"start_date": "2025-02-01", "event_name": "click", "incremental": true},
+    "properties": {"464149233": {"tokens_per_hour": 14000}},
+    "jobs": [
+      {"name": "cafe24pro_source", "property_id": "464149233", "sheet_id": "...",
+       "key_column": "B", "dimension": "sessionSource", "offsets": {"sba": 22}}
+    ]
+  }
+
+작업 항목:
+  name, property_id, sheet_id, key_column, dimension  (필수)
+  label_column : 출력용 열. 주어지면 이 열도 비어 있지 않은 행만 사용
+  values       : 키 열 값 중 이 값들만 사용
+  filters      : runReport andGroup에 덧붙일 GA FilterExpression 리스트
+  offsets      : 키 값 → 누적값에 더할 보정값
+  event_name, start_date, incremental : defaults 덮어쓰기
+filters / event_name / start_date를 기본값과 다르게 준 작업은 로컬 일자별 저장소를 쓰지 않고 전체 기간을 직접 조회한다.
+
+사용 예:
+  python job_engine.py --config jobs.json
+  python job_engine.py --jobs cafe24pro_source,cafe24pro_campaign --workers 2
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cassette
+import report_cache
+import run_metrics
+from daily_store import get_cumulative_clicks, plan_daily_report
+from ga_client import get_sheets_service
+from ga_executor import TOKENS_PER_HOUR, QuotaLimiter
+from ga_reports import START_DATE, click_report_body, fetch_clicks
+from report_planner import ReportPlanner
+from sheet_snapshot import SheetSnapshot, column_index
+from sheet_writer import SheetWriteBuffer
+
+DEFAULT_CONFIG_PATH = os.getenv("GA_JOBS_CONFIG", "./jobs.json")
+
+DIMENSIONS = ("sessionSource", "sessionSourceMedium", "sessionCampaignName")
+
+REQUIRED_FIELDS = ("name", "property_id", "sheet_id", "key_column", "dimension")
+
+DEFAULTS = {
+    "start_date": START_DATE,
+    "event_name": "click",
+    "incremental": True,
+}
+
+
+def load_config(path):
+    """설정 파일을 읽어 defaults를 채운 작업 리스트와 property 설정을 반환. 잘못된 설정이면 ValueError."""
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    defaults = dict(DEFAULTS, **config.get("defaults", {}))
+    properties = {str(k): v for k, v in config.get("properties", {}).items()}
+
+    jobs = []
+    names = set()
+    for i, raw in enumerate(config.get("jobs", [])):
+        missing = [field for field in REQUIRED_FIELDS if not raw.get(field)]
+        if missing:
+            raise ValueError(f"작업 {i + 1}번에 필수 항목이 없습니다: {', '.join(missing)}")
+        job = dict(defaults, **raw)
+        job["property_id"] = str(job["property_id"])
+        if job["dimension"] not in DIMENSIONS:
+            raise ValueError(f"작업 '{job['name']}': 지원하지 않는 dimension {job['dimension']}")
+        if job["name"] in names:
+            raise ValueError(f"작업 이름이 중복됩니다: {job['name']}")
+        names.add(job["name"])
+        jobs.append(job)
+    return jobs, properties
+
+
+def snapshot_columns(job):
+    columns = [job["key_column"]] + ([job["label_column"]] if job.get("label_column") else [])
+    columns.sort(key=column_index)
+    return f"{columns[0]}:{columns[-1]}"
+
+
+def job_keys(job, snapshot):
+    """(행 번호, 키 값, 출력용 값) 목록."""
+    wanted = set(job["values"]) if job.get("values") else None
+    keys = []
+    for row_number, _ in snapshot.records():
+        key = snapshot.cell(row_number, job["key_column"]).strip()
+        label = snapshot.cell(row_number, job["label_column"]).strip() if job.get("label_column") else key
+        if not key or not label:
+            continue
+        if wanted is not None and key not in wanted:
+            continue
+        keys.append((row_number, key, label))
+    return keys
+
+
+def use_daily_store(job, options):
+    """로컬 일자별 저장소는 START_DATE부터의 click 이벤트를 dimension 값 전체로 쌓아 두므로 그 조건일 때만 쓴다."""
+    return (job["incremental"] and options["incremental"] and not job.get("filters")
+            and job["event_name"] == "click" and job["start_date"] == START_DATE)
+
+
+def job_report(job, keys, end_date, options):
+    """run_job이 보낼 첫 리포트 본문 (report_planner용). 저장소가 확정돼 있어 조회가 없으면 None."""
+    if use_daily_store(job, options):
+        return plan_daily_report(job["property_id"], job["dimension"], end_date,
+                                 full_rebuild=options["full_rebuild"])
+    return click_report_body(
+        job["dimension"], job["start_date"], end_date,
+        values=[key for _, key, _ in keys], extra_filters=job.get("filters"), event_name=job["event_name"]
+    )
+
+
+def job_totals(job, keys, end_date, options, limiter=None):
+    """작업의 start_date ~ end_date 누적 클릭 수 (소문자 값 → 클릭 수, 보정값 제외)."""
+    if use_daily_store(job, options):
+        return get_cumulative_clicks(
+            job["property_id"], job["dimension"], end_date,
+            full_rebuild=options["full_rebuild"], limiter=limiter
+        )
+    return fetch_clicks(
+        job["property_id"], job["dimension"], job["start_date"], end_date,
+        values=[key for _, key, _ in keys], extra_filters=job.get("filters"),
+        event_name=job["event_name"], limiter=limiter
+    )
+
+
+def prepare_job(job, sheets_service):
+    """
+    작업의 시트 스냅샷을 읽어 (오늘 날짜 열, 키 목록, 오늘 열의 지금 값)을 반환.
+    오늘 열이 없으면 열은 None.
+    """
+    print(f"\n[{job['name']}] {job['dimension']} → 시트 {job['sheet_id']} {job['key_column']}열")
+    snapshot = SheetSnapshot.load(sheets_service, job["sheet_id"], snapshot_columns(job))
+    today_column = snapshot.find_today_column()
+    if not today_column:
+        return None, [], {}
+    return today_column, job_keys(job, snapshot), snapshot.read_column(sheets_service, today_column)
+
+
+def run_job(job, prepared, sheets_service, limiter, end_date, options):
+    """
+    작업 하나 실행. {'name', 'success', 'failed', 'error'} 반환.
+    prepared의 현재값은 같은 시트 작업들이 공유하는 딕셔너리이고, 기록한 셀 값으로 갱신된다.
+    """
+    name = job["name"]
+    result = {"name": name, "property_id": job["property_id"], "success": 0, "failed": 0, "error": None}
+    today_column, keys, current = prepared
+    if not today_column:
+        result["error"] = "오늘 날짜 열 없음"
+        result["failed"] = 1
+        return result
+    if not keys:
+        print(f"[{name}] 기록할 키가 없습니다.")
+        return result
+
+    totals = job_totals(job, keys, end_date, options, limiter=limiter)
+
+    offsets = job.get("offsets", {})
+    writer = SheetWriteBuffer(sheets_service, job["sheet_id"])
+    writer.set_current(current)
+    for row_number, key, label in keys:
+        total_clicks = totals.get(key.lower(), 0) + offsets.get(key, 0)
+        writer.add(label, today_column, row_number, total_clicks)
+
+    print(f"[{name}] {len(writer)}개 셀을 시트에 기록합니다...")
+    result["success"], result["failed"] = writer.flush()
+    # 같은 셀에 쓰는 다음 작업이 이 작업이 쓴 값과 비교하도록 시트 공용 현재값을 갱신
+    current.update(writer.current)
+    return result
+
+
+def failed_result(job, error):
+    print(f"[{job['name']}] 작업 실패: {error}")
+    return {"name": job["name"], "property_id": job["property_id"],
+            "success": 0, "failed": 1, "error": str(error)}
+
+
+def run_property(property_id, jobs, settings, options):
+    """
+    워커 프로세스: property 하나의 작업들을 실행하고 결과 리스트를 반환.
+    먼저 작업마다 시트를 읽어 보낼 리포트를 모으고, report_planner로 batchRunReports를 보낸 뒤
+    작업을 설정 순서대로 실행한다.
+    """
+    # 워커 프로세스 하나가 property 여러 개를 맡을 수 있으므로 호출 기록은 property마다 새로 시작
+    run_metrics.reset()
+    if not options["cache"]:
+        report_cache.set_enabled(False)
+    limiter = QuotaLimiter(tokens_per_hour=settings.get("tokens_per_hour", TOKENS_PER_HOUR))
+    sheets_service = get_sheets_service()
+    end_date = cassette.now().strftime("%Y-%m-%d")
+
+    results = {}
+    prepared = {}
+    # 시트마다 오늘 열의 현재값을 하나만 두고 작업들이 공유 (작업이 기록할 때마다 갱신)
+    current_by_sheet = {}
+    planner = ReportPlanner(limiter)
+    with run_metrics.tagged(stage=property_id):
+        for job in jobs:
+            with run_metrics.tagged(label=job["name"]):
+                try:
+                    today_column, keys, read_values = prepare_job(job, sheets_service)
+                except Exception as e:
+                    results[job["name"]] = failed_result(job, e)
+                    continue
+            current = current_by_sheet.setdefault(job["sheet_id"], {})
+            for cell, value in read_values.items():
+                current.setdefault(cell, value)
+            prepared[job["name"]] = (today_column, keys, current)
+            if today_column and keys and options["batch"]:
+                body = job_report(job, keys, end_date, options)
+                if body:
+                    planner.add(property_id, body)
+
+        try:
+            if len(planner):
+                planner.execute()
+            for job in jobs:
+                if job["name"] in results:
+                    continue
+                with run_metrics.tagged(label=job["name"]):
+                    try:
+                        results[job["name"]] = run_job(
+                            job, prepared[job["name"]], sheets_service, limiter, end_date, options
+                        )
+                    except Exception as e:
+                        results[job["name"]] = failed_result(job, e)
+        finally:
+            planner.close()
+
+    try:
+        run_metrics.write_reports(f"jobs_{property_id}")
+    except OSError as e:
+        print(f"실행 요약 기록 실패: {e}")
+    return [results[job["name"]] for job in jobs]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="설정 파일 기반 property/시트별 클릭 집계")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help=f"작업 설정 파일 (기본 {DEFAULT_CONFIG_PATH})")
+    parser.add_argument("--jobs", help="실행할 작업 이름 (쉼표 구분, 기본: 전체)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="동시에 실행할 property 수 (워커 프로세스 수)")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="로컬 일자별 저장소를 전체 기간으로 다시 받아 맞춤")
+    parser.add_argument("--no-incremental", action="store_true",
+                        help="로컬 저장소 없이 전체 기간을 GA에서 직접 조회")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="GA 리포트 로컬 캐시를 사용하지 않음")
+    parser.add_argument("--no-batch", action="store_true",
+                        help="작업 리포트를 batchRunReports로 묶지 않고 작업마다 runReport로 조회")
+    cassette.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    cassette.from_args(args)
+
+    jobs, properties = load_config(args.config)
+    if args.jobs:
+        selected = {name.strip() for name in args.jobs.split(",") if name.strip()}
+        unknown = selected - {job["name"] for job in jobs}
+        if unknown:
+            print(f"설정에 없는 작업: {', '.join(sorted(unknown))}")
+            exit(1)
+        jobs = [job for job in jobs if job["name"] in selected]
+
+    jobs_by_property = {}
+    for job in jobs:
+        jobs_by_property.setdefault(job["property_id"], []).append(job)
+
+    options = {
+        "incremental": not args.no_incremental,
+        "full_rebuild": args.full_rebuild,
+        "cache": not args.no_cache and report_cache.is_enabled(),
+        "batch": not args.no_batch,
+    }
+    print(f"작업 {len(jobs)}개, property {len(jobs_by_property)}개 실행")
+
+    success_count = 0
+    failed_count = 0
+    workers = max(1, min(args.workers, len(jobs_by_property) or 1))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(run_property, property_id, property_jobs,
+                            properties.get(property_id, {}), options): property_id
+            for property_id, property_jobs in jobs_by_property.items()
+        }
+        for future in as_completed(futures):
+            property_id = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"\n[property {property_id}] 워커 실패: {e}")
+                failed_count += len(jobs_by_property[property_id])
+                continue
+            print(f"\n[property {property_id}] 완료")
+            for result in results:
+                status = f"오류: {result['error']}" if result["error"] else "완료"
+                print(f"  {result['name']}: 성공 {result['success']}, 실패 {result['failed']} ({status})")
+                success_count += result["success"]
+                failed_count += result["failed"]
+
+    print(f"\n전체 완료! (성공: {success_count}, 실패: {failed_count})")
+    if failed_count > 0:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+sessionSource → 클릭 수 맵 하나로 시트 키워드를 여러 방식으로 매칭.
+
+GA에는 값마다 요청을 보내지 않고 sessionSource 전체의 클릭 수를 한 번만 받아 두고,
+키워드마다 아래 방식으로 맞는 값들의 클릭 수를 합산한다.
+
+  exact    : 소문자로 같은 값 (기존 동작. GA의 EXACT 필터도 대소문자를 구분하지 않음)
+  casefold : 유니코드 casefold + 공백 정리 후 같은 값 (예: 'Naver ' / 'NAVER' → naver)
+  prefix   : casefold한 값이 키워드로 시작 (예: naver → naver_blog, naver.com). 트라이로 찾는다.
+  regex    : 정규식(re.search, 대소문자 무시)에 맞는 값
+
+트라이 노드마다 하위 값의 클릭 합계를 들고 있어 prefix는 키워드 길이만큼만 내려가면 되고,
+regex만 값 전체를 훑는다 (같은 패턴은 한 번만 계산).
+"""
+import re
+
+MATCH_MODES = ("exact", "casefold", "prefix", "regex")
+
+
+def normalize(value):
+    """casefold + 앞뒤 공백 제거 + 연속 공백 하나로."""
+    return " ".join(value.casefold().split())
+
+
+def parse_mode(text, default="exact"):
+    """시트 셀의 매칭 방식 문자열을 MATCH_MODES 값으로. 비어 있으면 default, 알 수 없으면 None."""
+    mode = str(text).strip().lower()
+    if not mode:
+        return default
+    return mode if mode in MATCH_MODES else None
+
+
+class _TrieNode:
+    __slots__ = ("children", "total")
+
+    def __init__(self):
+        self.children = {}
+        self.total = 0
+
+
+class KeywordMatcher:
+    def __init__(self, clicks_by_source):
+        """clicks_by_source: 소문자 sessionSource → 클릭 수 (fetch_clicks / get_cumulative_clicks 결과)."""
+        self.exact = clicks_by_source
+        self.folded = {}
+        self.root = _TrieNode()
+        for source, clicks in clicks_by_source.items():
+            key = normalize(source)
+            self.folded[key] = self.folded.get(key, 0) + clicks
+            node = self.root
+            node.total += clicks
+            for ch in key:
+                node = node.children.setdefault(ch, _TrieNode())
+                node.total += clicks
+        self._regex_totals = {}
+
+    def prefix_total(self, keyword):
+        node = self.root
+        for ch in normalize(keyword):
+            node = node.children.get(ch)
+            if node is None:
+                return 0
+        return node.total
+
+    def regex_total(self, pattern):
+        """패턴에 맞는 값들의 클릭 합계. 잘못된 패턴이면 re.error."""
+        if pattern not in self._regex_totals:
+            compiled = re.compile(pattern, re.IGNORECASE)
+            self._regex_totals[pattern] = sum(
+                clicks for source, clicks in self.exact.items() if compiled.search(source)
+            )
+        return self._regex_totals[pattern]
+
+    def clicks(self, keyword, mode="exact"):
+        """키워드 하나를 mode 방식으로 매칭한 클릭 합계."""
+        if mode == "exact":
+            return self.exact.get(keyword.lower(), 0)
+        if mode == "casefold":
+            return self.folded.get(normalize(keyword), 0)
+        if mode == "prefix":
+            return self.prefix_total(keyword)
+        if mode == "regex":
+            return self.regex_total(keyword.strip())
+        raise ValueError(f"알 수 없는 매칭 방식: {mode} (가능한 값: {', '.join(MATCH_MODES)})")
@@ -0,0 +1,216 @@
+"""
+주간 작업 4개를 한 프로세스에서 단계별로 실행하는 파이프라인.
+
+  wiki          : Confluence PR 링크 → 시트 B열 동기화 (cafe24pro_parameter)
+  source        : 검색어(sessionSource)별 누적 클릭 (GA_cafe24pro_data)
+  source_medium : viral / paid_youtube(sessionSourceMedium) 누적 클릭 (GA_cafe24pro_data_for_viralpaid_youtube)
+  campaign      : 캠페인(sessionCampaignName)별 누적 클릭 (cafe24pro_parameter_campain)
+
+인증 정보 1개, 시트 스냅샷 1개(헤더 + B:E), 쓰기 버퍼 1개를 모든 단계가 공유한다.
+wiki 단계가 먼저 돌아 새 키워드를 스냅샷에 반영하고, GA 단계들이 보낼 리포트를 report_planner로 모아
+batchRunReports로 미리 받아 둔 다음, 서로 독립인 GA 단계들을 병렬로 실행하고
+모든 셀을 마지막에 한 번에 기록한다.
+
+사용 예:
+  python pipeline.py                          # 전체 단계
+  python pipeline.py --stages source,campaign # 일부 단계만
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import cassette
+import report_cache
+import run_metrics
+import GA_cafe24pro_data
+import GA_cafe24pro_data_for_viralpaid_youtube
+import cafe24pro_parameter
+import cafe24pro_parameter_campain
+from ga_client import get_sheets_service
+from ga_executor import DEFAULT_CONCURRENCY, QuotaLimiter
+from ga_reports import START_DATE
+from report_planner import ReportPlanner
+from sheet_snapshot import SheetSnapshot
+from sheet_writer import SheetWriteBuffer
+
+SEARCH_TERMS_SHEET_ID = GA_cafe24pro_data.SEARCH_TERMS_SHEET_ID
+
+STAGES = ["wiki", "source", "source_medium", "campaign"]
+
+# GA 단계끼리 같은 셀(같은 행의 오늘 날짜 열)에 쓰면 뒤 단계 값이 이긴다.
+# 개별 워크플로 실행 순서(23:45 source → 23:50 campaign → 23:55 source_medium)와 같게 맞춤.
+GA_STAGES = ["source", "campaign", "source_medium"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="주간 위키 동기화 + GA 클릭 집계 파이프라인")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help=f"실행할 단계 (쉼표 구분, 기본: 전체) - {', '.join(STAGES)}")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="로컬 일자별 저장소를 전체 기간으로 다시 받아 맞춤")
+    parser.add_argument("--no-incremental", action="store_true",
+                        help="로컬 저장소 없이 전체 기간을 GA에서 직접 조회")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="GA 리포트 로컬 캐시를 사용하지 않음")
+    parser.add_argument("--no-batch", action="store_true",
+                        help="GA 리포트를 batchRunReports로 묶지 않고 단계마다 runReport로 조회")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"GA 단계 내부의 동시 요청 수 (기본 {DEFAULT_CONCURRENCY})")
+    GA_cafe24pro_data.add_match_arguments(parser)
+    parser.add_argument("--profile", type=int, nargs="?", const=10, metavar="N",
+                        help="종료 시 가장 느린 GA/시트 호출 N개 출력 (기본 10)")
+    cassette.add_arguments(parser)
+    args = parser.parse_args(argv)
+    GA_cafe24pro_data.check_match_arguments(parser, args)
+
+    args.stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"알 수 없는 단계: {', '.join(unknown)} (가능한 값: {', '.join(STAGES)})")
+    return args
+
+
+def run_wiki_stage(sheets_service, snapshot, writer):
+    """위키 PR 링크 중 새 키워드를 writer에 추가. 다른 시트를 쓰도록 설정돼 있으면 그 시트용 버퍼를 따로 만든다."""
+    wiki_sheet_id = cafe24pro_parameter.SPREADSHEET_ID or SEARCH_TERMS_SHEET_ID
+    if wiki_sheet_id != SEARCH_TERMS_SHEET_ID:
+        snapshot = SheetSnapshot.load(sheets_service, wiki_sheet_id, "B:B")
+        writer = SheetWriteBuffer(sheets_service, wiki_sheet_id)
+
+    pr_data = cafe24pro_parameter.get_wiki_pr_data()
+    cafe24pro_parameter.add_new_pr_rows(snapshot, writer, pr_data)
+    return writer
+
+
+def plan_ga_reports(ga_stages, snapshot, args, start_date, end_date):
+    """GA 단계들이 보낼 리포트를 모아 batchRunReports로 미리 받아 둔 플래너를 반환."""
+    incremental = not args.no_incremental
+    planner = ReportPlanner(QuotaLimiter())
+    for stage in ga_stages:
+        if stage == "source":
+            planner.add_all(GA_cafe24pro_data.plan_reports(
+                snapshot, start_date, end_date, incremental=incremental, full_rebuild=args.full_rebuild,
+                match_mode=args.match_mode, match_column=args.match_column
+            ))
+            continue
+        if stage == "source_medium":
+            module = GA_cafe24pro_data_for_viralpaid_youtube
+        else:
+            module = cafe24pro_parameter_campain
+        planner.add_all(module.plan_reports(
+            snapshot, start_date, end_date, incremental=incremental, full_rebuild=args.full_rebuild
+        ))
+    with run_metrics.tagged(stage="plan"):
+        planner.execute()
+    return planner
+
+
+def run_ga_stage(stage, snapshot, today_column, writer, args, start_date, end_date):
+    """GA 단계 하나를 실행하고 조회 실패 건수를 반환."""
+    with run_metrics.tagged(stage=stage):
+        return _run_ga_stage(stage, snapshot, today_column, writer, args, start_date, end_date)
+
+
+def _run_ga_stage(stage, snapshot, today_column, writer, args, start_date, end_date):
+    incremental = not args.no_incremental
+    if stage == "source":
+        return GA_cafe24pro_data.collect_search_term_clicks(
+            snapshot, today_column, writer, start_date, end_date,
+            incremental=incremental, full_rebuild=args.full_rebuild, concurrency=args.concurrency,
+            match_mode=args.match_mode, match_column=args.match_column
+        )
+    if stage == "source_medium":
+        return GA_cafe24pro_data_for_viralpaid_youtube.collect_viral_youtube_clicks(
+            snapshot, today_column, writer, start_date, end_date,
+            incremental=incremental, full_rebuild=args.full_rebuild
+        )
+    return cafe24pro_parameter_campain.collect_campaign_clicks(
+        snapshot, today_column, writer, start_date, end_date,
+        incremental=incremental, full_rebuild=args.full_rebuild, concurrency=args.concurrency
+    )
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_metrics.install("pipeline", profile_top=args.profile)
+    cassette.from_args(args)
+    if args.no_cache:
+        report_cache.set_enabled(False)
+
+    start_date = START_DATE
+    end_date = cassette.now().strftime("%Y-%m-%d")
+    print(f"주간 파이프라인 실행: {', '.join(args.stages)} ({start_date} ~ {end_date})")
+
+    sheets_service = get_sheets_service()
+
+    # 헤더 행 + B~E열(--match-column이 더 오른쪽이면 그 열까지) 스냅샷 하나를 모든 단계가 공유
+    snapshot = SheetSnapshot.load(sheets_service, SEARCH_TERMS_SHEET_ID,
+                                  GA_cafe24pro_data.snapshot_range(args.match_column, last_column="E"))
+    writer = SheetWriteBuffer(sheets_service, SEARCH_TERMS_SHEET_ID)
+    writers = [writer]
+    failed_count = 0
+
+    if "wiki" in args.stages:
+        print("\n[wiki] 위키 PR 링크 동기화")
+        try:
+            with run_metrics.tagged(stage="wiki"):
+                wiki_writer = run_wiki_stage(sheets_service, snapshot, writer)
+            if wiki_writer is not writer:
+                writers.append(wiki_writer)
+        except Exception as e:
+            print(f"[wiki] 위키 동기화 중 오류: {e}")
+            failed_count += 1
+
+    ga_stages = [stage for stage in GA_STAGES if stage in args.stages]
+    if ga_stages:
+        today_column = snapshot.find_today_column()
+        if not today_column:
+            print("오늘 날짜 열을 찾을 수 없어 GA 단계를 건너뜁니다.")
+            ga_stages = []
+
+    if ga_stages:
+        # 오늘 열의 지금 값과 같은 셀은 다시 쓰지 않음
+        writer.set_current(snapshot.read_column(sheets_service, today_column))
+
+        # 단계별 버퍼에 따로 모았다가 GA_STAGES 순서대로 공용 버퍼에 합침
+        stage_writers = {
+            stage: SheetWriteBuffer(sheets_service, SEARCH_TERMS_SHEET_ID) for stage in ga_stages
+        }
+        planner = None
+        if not args.no_batch:
+            planner = plan_ga_reports(ga_stages, snapshot, args, start_date, end_date)
+        try:
+            with ThreadPoolExecutor(max_workers=len(ga_stages)) as executor:
+                futures = {
+                    stage: executor.submit(
+                        run_ga_stage, stage, snapshot, today_column, stage_writers[stage],
+                        args, start_date, end_date
+                    )
+                    for stage in ga_stages
+                }
+                for stage, future in futures.items():
+                    try:
+                        failed_count += future.result()
+                    except Exception as e:
+                        print(f"[{stage}] 클릭 수 조회 중 오류: {e}")
+                        failed_count += 1
+                        continue
+                    writer.extend(stage_writers[stage])
+        finally:
+            if planner is not None:
+                planner.close()
+
+    success_count = 0
+    for stage_writer in writers:
+        print(f"\n{len(stage_writer)}개 셀을 시트에 기록합니다...")
+        succeeded, failed = stage_writer.flush()
+        success_count += succeeded
+        failed_count += failed
+
+    print(f"\n파이프라인 완료! (성공: {success_count}, 실패: {failed_count})")
+
+    if failed_count > 0:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+GA 리포트 응답 로컬 캐시 (SQLite).
+
+키는 property ID + 요청 본문을 정규화(JSON, 키 정렬)한 SHA-256 해시다.
+- 종료일이 오늘 이전인 닫힌 기간의 리포트는 결과가 바뀌지 않으므로 만료 없이 보관
+- 오늘(또는 today/yesterday/NdaysAgo 같은 상대 날짜)이 포함된 리포트는 짧게 보관
+- 전체 크기가 MAX_BYTES를 넘으면 가장 오래전에 읽힌 항목부터 삭제(LRU)
+실패 후 재실행할 때 GA 조회를 다시 하지 않고 실패한 쓰기만 다시 하게 하려는 용도.
+캐시는 최적화일 뿐이므로 잠금이나 파일 손상으로 SQLite 오류가 나면 경고만 하고 GA를 직접 조회한다.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import cassette
+
+CACHE_PATH = os.getenv("GA_REPORT_CACHE_PATH", "./ga_report_cache.sqlite3")
+
+# 오늘이 포함된 리포트 보관 시간(초)
+OPEN_RANGE_TTL = int(os.getenv("GA_REPORT_CACHE_TTL", "900"))
+
+# 다른 프로세스(job_engine의 property별 워커)가 쓰는 중일 때 기다릴 시간(초)
+LOCK_TIMEOUT = 10
+
+# 캐시 최대 크기(바이트)
+MAX_BYTES = int(os.getenv("GA_REPORT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# GA_REPORT_CACHE=off 또는 --no-cache로 캐시를 건너뜀
+_enabled = os.getenv("GA_REPORT_CACHE", "on").lower() not in ("0", "off", "false", "no")
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def cache_key(property_id, body):
+    canonical = json.dumps(
+        {"property": str(property_id), "body": body},
+        sort_keys=True, separators=(',', ':'), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def ttl_for(body, today=None):
+    """닫힌 기간이면 None(만료 없음), 오늘이나 상대 날짜가 포함되면 OPEN_RANGE_TTL."""
+    today = today or cassette.now().strftime("%Y-%m-%d")
+    for date_range in body.get("dateRanges", []):
+        end_date = date_range.get("endDate", "")
+        try:
+            datetime.strptime(end_date, "%Y-%m-%d")
+        except ValueError:
+            return OPEN_RANGE_TTL
+        if end_date >= today:
+            return OPEN_RANGE_TTL
+    return None
+
+
+class ReportCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+        # 여러 프로세스가 동시에 읽고 쓰므로 WAL로 읽기가 쓰기 잠금을 기다리지 않게 함
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS reports (
+                key TEXT PRIMARY KEY,
+                payload BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT payload, expires_at FROM reports WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self.conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE reports SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return json.loads(zlib.decompress(payload))
+
+    def put(self, key, response, ttl=None):
+        payload = zlib.compress(json.dumps(response, separators=(',', ':')).encode('utf-8'))
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO reports (key, payload, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), expires_at, now)
+            )
+            self._evict(now)
+            self.conn.commit()
+
+    def _evict(self, now):
+        self.conn.execute(
+            "DELETE FROM reports WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        )
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM reports ORDER BY accessed_at"
+        ).fetchall():
+            self.conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM reports")
+            self.conn.commit()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReportCache()
+        return _cache
+
+
+def cached_call(property_id, body, fetch):
+    """캐시에 있으면 그대로 반환하고, 없으면 fetch()를 호출해 결과를 저장한다."""
+    if not _enabled:
+        return fetch()
+
+    key = cache_key(property_id, body)
+    try:
+        response = get_cache().get(key)
+    except (sqlite3.Error, zlib.error, ValueError) as e:
+        print(f"GA 리포트 캐시 읽기 실패, 캐시 없이 조회합니다: {e}")
+        return fetch()
+    if response is not None:
+        return response
+
+    response = fetch()
+    try:
+        get_cache().put(key, response, ttl_for(body))
+    except sqlite3.Error as e:
+        print(f"GA 리포트 캐시 저장 실패: {e}")
+    return response
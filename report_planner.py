@@ -0,0 +1,103 @@
+"""
+여러 단계/작업의 runReport 요청을 모아 batchRunReports로 한 번에 보내는 플래너.
+
+세 GA 단계는 같은 기간의 eventName = click 리포트를 dimension만 바꿔 따로 보낸다.
+플래너는 단계마다 보낼 리포트(첫 페이지 요청 본문)를 먼저 모아 같은 요청은 하나로 합치고,
+property별로 최대 MAX_BATCH_SIZE개씩 묶어 batchRunReports로 보낸다.
+받은 응답은 ga_reports.prefetch로 등록해 두므로, 이후 단계가 평소처럼 run_report를 부르면
+네트워크 없이 자기 리포트를 돌려받는다. 행이 한 페이지를 넘는 리포트의 다음 페이지와
+배치가 실패한 리포트는 기존처럼 runReport로 받는다.
+
+사용 예:
+  planner = ReportPlanner(limiter)
+  planner.add(property_id, body)        # 단계마다
+  planner.execute()
+  ... 단계 실행 ...
+  planner.close()
+"""
+import report_cache
+import run_metrics
+from ga_client import get_analytics_service
+from ga_reports import clear_prefetched, page_body, prefetch
+
+# batchRunReports 한 번에 넣을 수 있는 최대 리포트 수
+MAX_BATCH_SIZE = 5
+
+
+class ReportPlanner:
+    def __init__(self, limiter=None, batch_size=MAX_BATCH_SIZE):
+        self.limiter = limiter
+        self.batch_size = batch_size
+        # 캐시 키 → (property_id, 첫 페이지 요청 본문). 같은 요청은 한 번만 보낸다.
+        self.specs = {}
+
+    def add(self, property_id, body):
+        """리포트 하나를 계획에 추가 (body는 run_report/iter_report_rows에 넘길 본문 그대로)."""
+        first_page = page_body(body)
+        self.specs.setdefault(report_cache.cache_key(property_id, first_page), (str(property_id), first_page))
+
+    def add_all(self, specs):
+        for property_id, body in specs:
+            self.add(property_id, body)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def execute(self):
+        """
+        모은 리포트를 property별로 묶어 batchRunReports로 보내고 응답을 등록.
+        로컬 캐시에 있는 리포트는 보내지 않는다. 보낸 batchRunReports 요청 수를 반환.
+        """
+        by_property = {}
+        for key, (property_id, body) in self.specs.items():
+            if report_cache.is_enabled():
+                response = report_cache.get_cache().get(key)
+                if response is not None:
+                    prefetch(property_id, body, response)
+                    continue
+            by_property.setdefault(property_id, []).append(body)
+
+        batch_count = 0
+        for property_id, bodies in by_property.items():
+            for start in range(0, len(bodies), self.batch_size):
+                chunk = bodies[start:start + self.batch_size]
+                batch_count += 1
+                try:
+                    reports = self._batch_run(property_id, chunk)
+                except Exception as e:
+                    # 실패한 리포트는 단계에서 runReport로 다시 받음
+                    print(f"batchRunReports 실패 (리포트 {len(chunk)}개는 개별 조회): {e}")
+                    continue
+                for body, report in zip(chunk, reports):
+                    prefetch(property_id, body, report)
+                    if report_cache.is_enabled():
+                        report_cache.get_cache().put(
+                            report_cache.cache_key(property_id, body), report, report_cache.ttl_for(body)
+                        )
+
+        print(f"GA 리포트 {len(self.specs)}개 계획 → batchRunReports {batch_count}회")
+        return batch_count
+
+    def _batch_run(self, property_id, bodies):
+        target = f"properties/{property_id}"
+        with run_metrics.timed("ga", "batchRunReports", f"{target} ({len(bodies)} reports)") as call:
+            def request():
+                with call.attempt():
+                    response = get_analytics_service().properties().batchRunReports(
+                        property=target,
+                        body={"requests": [dict(body, returnPropertyQuota=True) for body in bodies]}
+                    ).execute()
+                # QuotaLimiter는 응답 최상위의 propertyQuota로 토큰을 보정하므로 마지막 리포트 값을 올려 둔다
+                reports = response.get("reports", [])
+                if reports and reports[-1].get("propertyQuota"):
+                    response["propertyQuota"] = reports[-1]["propertyQuota"]
+                return response
+
+            response = self.limiter.call(request) if self.limiter else request()
+            call.set_response(response)
+        return response.get("reports", [])
+
+    def close(self):
+        """등록해 둔 응답을 버림."""
+        clear_prefetched()
+        self.specs.clear()
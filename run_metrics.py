@@ -0,0 +1,304 @@
+"""
+GA / 시트 / 위키 호출별 측정값과 실행 요약.
+
+모든 runReport, 시트 values 읽기/쓰기, 위키 요청을 timed()로 감싸서
+소요 시간, 응답 크기, 재시도 횟수, propertyQuota를 단계(stage)/키워드(label) 태그와 함께 기록한다.
+install()을 부르면 프로세스 종료 시 JSON 실행 요약과 Prometheus textfile을 쓰고,
+profile_top이 주어지면 가장 느린 호출 N개를 출력한다.
+
+태그는 스레드별로 관리하므로, 작업 스레드에서는 current_tags()로 받은 태그를 다시 tagged()로 건다.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+METRICS_DIR = os.getenv("RUN_METRICS_DIR", ".")
+
+# Prometheus 메트릭 이름 접두사
+METRIC_PREFIX = "cafe24pro"
+
+_calls = []
+_lock = threading.Lock()
+_local = threading.local()
+_started_at = time.time()
+_installed = False
+
+
+class CallRecord:
+    """호출 한 건의 측정값."""
+
+    def __init__(self, kind, name, target=None):
+        tags = current_tags()
+        self.kind = kind
+        self.name = name
+        self.target = target
+        self.stage = tags.get("stage")
+        self.label = tags.get("label")
+        self.started_at = time.time()
+        self.wall = 0.0
+        self.latency = 0.0
+        self.attempts = 0
+        self.bytes = 0
+        self.quota = None
+        self.cached = False
+        self.error = None
+
+    @contextmanager
+    def attempt(self):
+        """실제 요청 1회(재시도 포함 각각)의 소요 시간을 latency에 더한다."""
+        self.attempts += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latency += time.perf_counter() - started
+
+    def set_response(self, response, size=None):
+        """응답 크기와 propertyQuota(있으면)를 기록."""
+        if size is None:
+            size = len(json.dumps(response, ensure_ascii=False).encode("utf-8")) if response is not None else 0
+        self.bytes += size
+        if isinstance(response, dict) and response.get("propertyQuota"):
+            self.quota = response["propertyQuota"]
+
+    @property
+    def retries(self):
+        return max(0, self.attempts - 1)
+
+    def as_dict(self):
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "target": self.target,
+            "stage": self.stage,
+            "label": self.label,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "wall_seconds": round(self.wall, 4),
+            "latency_seconds": round(self.latency, 4),
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "cached": self.cached,
+            "quota_consumed": quota_consumed(self.quota),
+            "quota_remaining": quota_remaining(self.quota),
+            "error": self.error,
+        }
+
+
+def current_tags():
+    return dict(getattr(_local, "tags", {}))
+
+
+@contextmanager
+def tagged(**tags):
+    """이 스레드에서 기록하는 호출에 stage / label 태그를 붙임."""
+    previous = getattr(_local, "tags", {})
+    _local.tags = dict(previous, **{key: value for key, value in tags.items() if value is not None})
+    try:
+        yield
+    finally:
+        _local.tags = previous
+
+
+@contextmanager
+def timed(kind, name, target=None):
+    """
+    호출 하나를 측정. with 블록 전체 시간이 wall, call.attempt()로 감싼 구간 합이 latency.
+    attempt()를 쓰지 않으면 wall을 latency로 본다.
+    """
+    call = CallRecord(kind, name, target)
+    started = time.perf_counter()
+    try:
+        yield call
+    except BaseException as e:
+        call.error = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        call.wall = time.perf_counter() - started
+        if not call.attempts:
+            call.attempts = 1
+            call.latency = call.wall
+        with _lock:
+            _calls.append(call)
+
+
+def record_cache_hit(kind, name, target=None):
+    """로컬 캐시에서 돌려준 호출 (시간/토큰 0)."""
+    call = CallRecord(kind, name, target)
+    call.cached = True
+    call.attempts = 0
+    with _lock:
+        _calls.append(call)
+
+
+def quota_consumed(property_quota):
+    hourly = (property_quota or {}).get("tokensPerProjectPerHour") or (property_quota or {}).get("tokensPerHour")
+    return int(hourly.get("consumed", 0)) if hourly else 0
+
+
+def quota_remaining(property_quota):
+    hourly = (property_quota or {}).get("tokensPerProjectPerHour") or (property_quota or {}).get("tokensPerHour")
+    return int(hourly["remaining"]) if hourly and hourly.get("remaining") is not None else None
+
+
+def calls():
+    with _lock:
+        return list(_calls)
+
+
+def reset():
+    global _started_at
+    with _lock:
+        _calls.clear()
+    _started_at = time.time()
+
+
+def summary(job=None):
+    """실행 전체 요약 딕셔너리 (종류/호출별 합계, GA 토큰, 중복 시트 읽기, 가장 느린 호출)."""
+    records = calls()
+    groups = {}
+    for call in records:
+        key = (call.kind, call.name, call.stage or "")
+        group = groups.setdefault(key, {
+            "kind": call.kind, "name": call.name, "stage": call.stage,
+            "count": 0, "cached": 0, "errors": 0, "retries": 0, "bytes": 0,
+            "latency_seconds": 0.0, "max_latency_seconds": 0.0, "quota_consumed": 0,
+        })
+        group["count"] += 1
+        group["cached"] += call.cached
+        group["errors"] += call.error is not None
+        group["retries"] += call.retries
+        group["bytes"] += call.bytes
+        group["latency_seconds"] += call.latency
+        group["max_latency_seconds"] = max(group["max_latency_seconds"], call.latency)
+        group["quota_consumed"] += quota_consumed(call.quota)
+
+    # 같은 시트 범위를 여러 번 읽은 횟수 (첫 읽기 제외)
+    reads = {}
+    for call in records:
+        if call.kind == "sheets" and call.name in ("get", "batchGet") and not call.error:
+            reads[call.target] = reads.get(call.target, 0) + 1
+    repeated_reads = {target: count - 1 for target, count in reads.items() if count > 1}
+
+    remaining = [quota_remaining(call.quota) for call in records if quota_remaining(call.quota) is not None]
+
+    return {
+        "job": job,
+        "started_at": datetime.fromtimestamp(_started_at).isoformat(timespec="seconds"),
+        "duration_seconds": round(time.time() - _started_at, 3),
+        "calls": len(records),
+        "ga_quota_tokens_consumed": sum(quota_consumed(call.quota) for call in records),
+        "ga_quota_tokens_remaining": min(remaining) if remaining else None,
+        "sheet_repeated_reads": sum(repeated_reads.values()),
+        "sheet_repeated_read_ranges": repeated_reads,
+        "groups": [
+            dict(group, latency_seconds=round(group["latency_seconds"], 4),
+                 max_latency_seconds=round(group["max_latency_seconds"], 4))
+            for group in groups.values()
+        ],
+        "slowest": [call.as_dict() for call in slowest(10)],
+    }
+
+
+def slowest(n=10):
+    return sorted(calls(), key=lambda call: call.latency, reverse=True)[:n]
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(run_summary):
+    """실행 요약을 Prometheus textfile 형식 문자열로 변환."""
+    job = run_summary.get("job") or ""
+    lines = []
+
+    def metric(name, metric_type, help_text, samples):
+        lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_{name} {metric_type}")
+        for labels, value in samples:
+            labels = dict(labels, job_name=job)
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in sorted(labels.items()))
+            lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}")
+
+    groups = run_summary["groups"]
+
+    def group_labels(group):
+        return {"kind": group["kind"], "call": group["name"], "stage": group["stage"] or ""}
+
+    metric("calls_total", "counter", "I/O calls per kind/call/stage",
+           [(group_labels(g), g["count"]) for g in groups])
+    metric("call_cache_hits_total", "counter", "Calls served from the local cache",
+           [(group_labels(g), g["cached"]) for g in groups])
+    metric("call_errors_total", "counter", "Calls that raised",
+           [(group_labels(g), g["errors"]) for g in groups])
+    metric("call_retries_total", "counter", "Retried attempts (429/503)",
+           [(group_labels(g), g["retries"]) for g in groups])
+    metric("call_seconds_sum", "counter", "Total request latency in seconds",
+           [(group_labels(g), g["latency_seconds"]) for g in groups])
+    metric("call_seconds_max", "gauge", "Slowest single request in seconds",
+           [(group_labels(g), g["max_latency_seconds"]) for g in groups])
+    metric("response_bytes_total", "counter", "Response bytes",
+           [(group_labels(g), g["bytes"]) for g in groups])
+    metric("ga_quota_tokens_consumed_total", "counter", "GA property quota tokens consumed",
+           [(group_labels(g), g["quota_consumed"]) for g in groups if g["kind"] == "ga"])
+    if run_summary["ga_quota_tokens_remaining"] is not None:
+        metric("ga_quota_tokens_remaining", "gauge", "Lowest remaining hourly GA tokens seen",
+               [({}, run_summary["ga_quota_tokens_remaining"])])
+    metric("sheet_repeated_reads_total", "counter", "Sheet range reads beyond the first",
+           [({}, run_summary["sheet_repeated_reads"])])
+    metric("run_duration_seconds", "gauge", "Run wall time in seconds",
+           [({}, run_summary["duration_seconds"])])
+    metric("run_timestamp_seconds", "gauge", "Unix time the run finished",
+           [({}, int(time.time()))])
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_reports(job, metrics_dir=None):
+    """JSON 실행 요약과 Prometheus textfile을 쓰고 두 경로를 반환."""
+    metrics_dir = metrics_dir or METRICS_DIR
+    run_summary = summary(job)
+    summary_path = os.path.join(metrics_dir, f"run_summary_{job}.json")
+    prom_path = os.path.join(metrics_dir, f"{METRIC_PREFIX}_{job}.prom")
+    _write_atomic(summary_path, json.dumps(run_summary, ensure_ascii=False, indent=2))
+    _write_atomic(prom_path, prometheus_text(run_summary))
+    return summary_path, prom_path
+
+
+def print_slowest(n):
+    print(f"\n=== 가장 느린 호출 {n}개 ===")
+    for call in slowest(n):
+        tags = " ".join(part for part in (call.stage, call.label) if part)
+        retries = f" 재시도 {call.retries}회" if call.retries else ""
+        print(f"{call.latency:8.3f}s  {call.kind}.{call.name}  {call.target or ''}  {tags}{retries}"
+              f"  {call.bytes:,}B")
+
+
+def install(job, profile_top=None, metrics_dir=None):
+    """종료 시 실행 요약/Prometheus 파일을 쓰고, profile_top이 있으면 느린 호출을 출력하도록 등록."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    def on_exit():
+        if profile_top:
+            print_slowest(profile_top)
+        try:
+            summary_path, prom_path = write_reports(job, metrics_dir)
+            print(f"실행 요약 기록: {summary_path}, {prom_path}")
+        except OSError as e:
+            print(f"실행 요약 기록 실패: {e}")
+
+    atexit.register(on_exit)
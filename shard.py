@@ -0,0 +1,212 @@
+"""
+검색어 샤딩과 결과 병합.
+
+검색어마다 runReport를 보내야 하는 경우(--per-term) 러너 하나가 B열 전체를 도는 대신,
+GA_cafe24pro_data.py --shard i/N으로 검색어를 N개 묶음으로 나눠 매트릭스 작업에서 동시에 돌린다.
+
+  - 검색어는 안정적인 해시(sha1)로 묶음을 정하므로 실행마다, 러너마다 같은 묶음이 나온다.
+    같은 검색어가 여러 행에 있어도 한 묶음에 모여 요청은 검색어당 한 번이다.
+  - 샤드 실행은 시트에 쓰지 않고 기록할 셀을 JSON 결과 파일(아티팩트)로 남긴다.
+  - 병합 단계(이 스크립트)가 N개 결과 파일을 샤드 순서대로 모아 시트마다 batchUpdate로 한 번에 기록한다.
+    샤드끼리 셀이 겹치지 않으므로 서로 덮어쓰지 않는다.
+  - 일부 샤드 결과가 없으면 있는 샤드의 셀만 기록하고 실패(exit 1)로 끝난다. 결과가 하나도 없으면 기록 없이 실패.
+
+사용 예:
+  python GA_cafe24pro_data.py --per-term --shard 1/4 --shard-out shard_results/source_1.json
+  python shard.py shard_results --expect 4
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+
+import cassette
+import run_metrics
+from ga_client import get_sheets_service
+from sheet_snapshot import read_columns
+from sheet_writer import SheetWriteBuffer
+
+
+def parse_shard(text):
+    """'i/N'(1 ≤ i ≤ N) → (i, N). 형식이 틀리면 ValueError."""
+    index, _, count = str(text).partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"샤드는 i/N 형식이어야 합니다: {text}")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"샤드 번호는 1 ~ N 사이여야 합니다: {text}")
+    return index, count
+
+
+def shard_of(key, count):
+    """키가 속하는 샤드 번호(1 ~ count). 프로세스마다 달라지는 hash() 대신 sha1을 쓴다."""
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+
+def select(keys, shard):
+    """shard=(i, N)에 속하는 키만 원래 순서대로. shard가 None이면 전체."""
+    if shard is None:
+        return list(keys)
+    index, count = shard
+    return [key for key in keys if shard_of(key, count) == index]
+
+
+def write_result(path, shard, spreadsheet_id, writer, failed_count):
+    """샤드 하나의 기록할 셀과 실패 수를 JSON 결과 파일로 저장."""
+    index, count = shard
+    result = {
+        "shard": index,
+        "shards": count,
+        "spreadsheet_id": spreadsheet_id,
+        "failed": failed_count,
+        "cells": [
+            {"label": label, "range": cell_range, "values": values}
+            for label, cell_range, values in writer.entries()
+        ],
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"샤드 {index}/{count}: 셀 {len(result['cells'])}개, 실패 {failed_count}개 → {path}")
+
+
+def result_paths(paths):
+    """인자로 받은 파일과 폴더(안의 *.json)를 결과 파일 경로 목록으로. 없는 폴더는 건너뛴다."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(glob.glob(os.path.join(path, "*.json"))))
+        elif os.path.exists(path):
+            found.append(path)
+        else:
+            print(f"✗ 결과 파일이 없습니다: {path}")
+    return found
+
+
+def load_results(paths):
+    """결과 파일들을 읽어 샤드 번호 순으로 정렬한 리스트를 반환."""
+    results = []
+    for path in result_paths(paths):
+        with open(path, encoding="utf-8") as f:
+            result = json.load(f)
+        result["path"] = path
+        results.append(result)
+    return sorted(results, key=lambda result: (result["spreadsheet_id"], result["shard"]))
+
+
+def check_results(results, expect=None):
+    """
+    결과 파일 묶음을 검사해서 (기록을 멈춰야 하는 문제, 빠진 샤드) 목록을 반환.
+    샤드 수가 다르거나 같은 샤드 결과가 여러 개면 나눈 방식이 달라 병합하지 않는다.
+    빠진 샤드가 있으면 나머지는 기록하고 실패로 끝낸다.
+    """
+    fatal = []
+    missing = []
+    counts = {result["shards"] for result in results}
+    if expect:
+        counts.add(expect)
+    if len(counts) > 1:
+        fatal.append(f"샤드 수가 서로 다릅니다: {sorted(counts)}")
+        return fatal, missing
+    count = counts.pop() if counts else 0
+    by_sheet = {}
+    for result in results:
+        by_sheet.setdefault(result["spreadsheet_id"], []).append(result["shard"])
+    for spreadsheet_id, shards in by_sheet.items():
+        duplicated = sorted({shard for shard in shards if shards.count(shard) > 1})
+        if duplicated:
+            fatal.append(f"시트 {spreadsheet_id}: 샤드 {duplicated} 결과가 여러 개입니다")
+        absent = sorted(set(range(1, count + 1)) - set(shards))
+        if absent:
+            missing.append(f"시트 {spreadsheet_id}: 샤드 {absent} 결과가 없습니다")
+    return fatal, missing
+
+
+def merge_sheet(sheets_service, spreadsheet_id, results):
+    """한 시트의 샤드 결과를 버퍼 하나로 모아 기록하고 (성공 수, 실패 수)를 반환."""
+    writer = SheetWriteBuffer(sheets_service, spreadsheet_id)
+    owners = {}
+    conflicts = 0
+    for result in results:
+        for cell in result["cells"]:
+            owner = owners.setdefault(cell["range"], (result["shard"], cell["values"]))
+            if owner[0] != result["shard"] and owner[1] != cell["values"]:
+                print(f"✗ {cell['range']}: 샤드 {owner[0]}와 {result['shard']}의 값이 다릅니다 "
+                      f"({owner[1]} / {cell['values']}), 뒤 샤드 값을 씁니다")
+                conflicts += 1
+            writer.add_range(cell["label"], cell["range"], cell["values"])
+
+    if not len(writer):
+        return 0, conflicts
+
+    # 오늘 열의 지금 값과 같은 셀은 다시 쓰지 않음
+    letters = sorted({cell_range.rstrip("0123456789") for cell_range in owners if ":" not in cell_range})
+    current = {}
+    for letter, values in read_columns(sheets_service, spreadsheet_id, letters,
+                                       value_render_option="UNFORMATTED_VALUE").items():
+        current.update({f"{letter}{i + 1}": value for i, value in enumerate(values) if value != ''})
+    writer.set_current(current)
+
+    print(f"\n{len(writer)}개 셀을 시트 {spreadsheet_id}에 기록합니다...")
+    success_count, fail_count = writer.flush()
+    return success_count, fail_count + conflicts
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="--shard i/N 실행 결과 파일을 모아 시트에 한 번에 기록")
+    parser.add_argument("paths", nargs="*", default=["shard_results"],
+                        help="샤드 결과 파일(JSON) 또는 폴더 (기본 shard_results)")
+    parser.add_argument("--expect", type=int, help="기대하는 샤드 수 N (기본: 결과 파일에 적힌 값)")
+    parser.add_argument("--profile", type=int, nargs="?", const=10, metavar="N",
+                        help="종료 시 가장 느린 시트 호출 N개 출력 (기본 10)")
+    cassette.add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    run_metrics.install("merge", profile_top=args.profile)
+    cassette.from_args(args)
+
+    results = load_results(args.paths)
+    expected = args.expect or (results[0]["shards"] if results else None)
+    present = len({result["shard"] for result in results})
+    print(f"샤드 결과 {present}/{expected or '?'}개")
+    if not results:
+        print("✗ 샤드 결과가 하나도 없어 시트에 기록하지 않습니다.")
+        exit(1)
+
+    fatal, missing = check_results(results, expect=args.expect)
+    for problem in fatal + missing:
+        print(f"✗ {problem}")
+    if fatal:
+        print("결과 파일이 서로 맞지 않아 시트에 기록하지 않습니다.")
+        exit(1)
+
+    by_sheet = {}
+    for result in results:
+        by_sheet.setdefault(result["spreadsheet_id"], []).append(result)
+
+    sheets_service = get_sheets_service()
+    success_count = 0
+    fail_count = sum(result["failed"] for result in results)
+    for spreadsheet_id, sheet_results in by_sheet.items():
+        print(f"시트 {spreadsheet_id}: 샤드 {', '.join(str(result['shard']) for result in sheet_results)} 병합")
+        succeeded, failed = merge_sheet(sheets_service, spreadsheet_id, sheet_results)
+        success_count += succeeded
+        fail_count += failed
+
+    print(f"\n병합 완료! (성공: {success_count}, 실패: {fail_count})")
+    if fail_count > 0 or missing:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+실행당 한 번 읽는 시트 스냅샷.
+
+헤더 행(1:1)과 필요한 열 범위(예: B:B, B:E)를 batchGet 한 번으로 읽고,
+키워드(첫 번째 열) → 행 번호 목록 딕셔너리를 미리 만들어 둔다.
+검색어 목록, 키워드 행 찾기, 날짜 열 찾기를 모두 이 스냅샷으로 처리한다.
+"""
+import re
+from datetime import date, datetime, timedelta
+
+import cassette
+import run_metrics
+
+# YYYY-MM-DD / YYYY.MM.DD / YYYY/MM/DD
+FULL_DATE_PATTERN = re.compile(r'(\d{4})[-./](\d{1,2})[-./](\d{1,2})')
+# MM/DD (연도 없음)
+SHORT_DATE_PATTERN = re.compile(r'(?<![\d/])(\d{1,2})/(\d{1,2})(?![\d/])')
+
+# 오른쪽에 날짜 열이 없는 MM/DD는 오늘부터 이 일수 뒤까지를 미래 열로 인정 (미리 만들어 둔 다음 주 열 등)
+FUTURE_DAYS = 60
+
+
+def column_index(column):
+    """'A' → 0, 'B' → 1, ..."""
+    index = 0
+    for ch in column:
+        index = index * 26 + (ord(ch.upper()) - 64)
+    return index - 1
+
+
+def column_letter(index):
+    """0 → 'A', 25 → 'Z', 26 → 'AA', 701 → 'ZZ', 702 → 'AAA', ..."""
+    letters = ''
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def parse_header_date(cell, default_year):
+    """
+    헤더 셀 문자열에서 날짜를 찾아 date로 반환. 없으면 None.
+    MM/DD처럼 연도가 없으면 default_year를 쓴다.
+    """
+    text = str(cell).strip()
+    match = FULL_DATE_PATTERN.search(text)
+    try:
+        if match:
+            return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        match = SHORT_DATE_PATTERN.search(text)
+        if match:
+            return date(default_year, int(match.group(1)), int(match.group(2)))
+    except ValueError:
+        return None
+    return None
+
+
+def build_date_columns(header, today=None):
+    """
+    헤더 행의 각 셀을 한 번씩만 파싱해서 날짜 → 열 문자 딕셔너리를 만든다.
+    같은 날짜가 여러 열에 있으면 왼쪽 열을 쓴다.
+    연도 없는 MM/DD는 오른쪽에서 왼쪽으로 정한다. 오른쪽의 가장 가까운 날짜 열(YYYY-MM-DD이거나 이미 정한 MM/DD)
+    이하인 가장 늦은 날짜로 보고, 오른쪽에 날짜 열이 없으면 오늘 + FUTURE_DAYS 이하인 가장 늦은 날짜로 본다.
+    시트가 1년 넘게 이어져도 맨 왼쪽 열이 올해로 잡혀 전체가 1년 밀리지 않는다.
+    """
+    today = today or cassette.now().date()
+    parsed = [None] * len(header)
+    anchor = today + timedelta(days=FUTURE_DAYS)
+    for i in range(len(header) - 1, -1, -1):
+        cell = header[i]
+        if not cell:
+            continue
+        text = str(cell).strip()
+        if FULL_DATE_PATTERN.search(text):
+            parsed[i] = parse_header_date(text, today.year)
+        else:
+            parsed[i] = _latest_on_or_before(text, anchor)
+        if parsed[i] is not None:
+            anchor = parsed[i]
+
+    columns = {}
+    for i, day in enumerate(parsed):
+        if day is not None:
+            columns.setdefault(day, column_letter(i))
+    return columns
+
+
+def _latest_on_or_before(text, limit):
+    """연도 없는 헤더를 limit 이하인 가장 늦은 날짜로 (limit 연도부터 한 해씩 거슬러 올라가며 시도)."""
+    for year in range(limit.year, limit.year - 5, -1):
+        # 2/29는 윤년이 아닌 해에서 None이므로 몇 해 더 거슬러 올라간다
+        day = parse_header_date(text, year)
+        if day is not None and day <= limit:
+            return day
+    return None
+
+
+def read_columns(sheets_service, spreadsheet_id, letters, value_render_option="FORMATTED_VALUE"):
+    """열 문자 목록을 batchGet 한 번으로 읽어 {열 문자: 행 순서대로 값 리스트} 반환."""
+    if not letters:
+        return {}
+    ranges = [f"{letter}:{letter}" for letter in letters]
+    with run_metrics.timed("sheets", "batchGet", f"{spreadsheet_id}!{','.join(ranges)}") as call:
+        result = sheets_service.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=ranges,
+            valueRenderOption=value_render_option
+        ).execute()
+        call.set_response(result)
+    columns = {}
+    for letter, value_range in zip(letters, result.get('valueRanges', [])):
+        columns[letter] = [row[0] if row else '' for row in value_range.get('values', [])]
+    return columns
+
+
+class SheetSnapshot:
+    def __init__(self, spreadsheet_id, header, rows, columns="B:B"):
+        self.spreadsheet_id = spreadsheet_id
+        self.header = header
+        self.rows = rows
+        self.columns = columns
+        self.first_column = columns.split(':')[0]
+        self._date_columns = None
+        self.index = {}
+        for i, row in enumerate(rows):
+            if i == 0:
+                # 헤더 행 스킵
+                continue
+            keyword = row[0].strip() if row and row[0] else ''
+            if keyword:
+                self.index.setdefault(keyword, []).append(i + 1)
+
+    @classmethod
+    def load(cls, sheets_service, spreadsheet_id, columns="B:B"):
+        with run_metrics.timed("sheets", "batchGet", f"{spreadsheet_id}!1:1,{columns}") as call:
+            result = sheets_service.spreadsheets().values().batchGet(
+                spreadsheetId=spreadsheet_id,
+                ranges=["1:1", columns]
+            ).execute()
+            call.set_response(result)
+        value_ranges = result.get('valueRanges', [])
+        header_values = value_ranges[0].get('values', []) if value_ranges else []
+        rows = value_ranges[1].get('values', []) if len(value_ranges) > 1 else []
+        return cls(spreadsheet_id, header_values[0] if header_values else [], rows, columns)
+
+    def terms(self):
+        """시트 순서대로 중복 없는 키워드 목록."""
+        return list(self.index)
+
+    def rows_for(self, keyword):
+        """키워드가 있는 모든 시트 행 번호(1부터). 없으면 빈 리스트."""
+        return self.index.get(keyword.strip(), [])
+
+    def cell(self, row_number, column):
+        """스냅샷에 포함된 열 범위 안의 셀 값. 비어 있으면 ''."""
+        offset = column_index(column) - column_index(self.first_column)
+        if row_number < 1 or row_number > len(self.rows) or offset < 0:
+            return ''
+        row = self.rows[row_number - 1]
+        return row[offset] if offset < len(row) else ''
+
+    def set_cell(self, row_number, column, value):
+        """
+        다른 단계에서 시트에 추가한 값을 스냅샷에도 반영 (열 범위 밖이면 무시).
+        첫 번째 열(키워드)이면 키워드 인덱스도 갱신한다.
+        """
+        offset = column_index(column) - column_index(self.first_column)
+        last_offset = column_index(self.columns.split(':')[-1]) - column_index(self.first_column)
+        if row_number < 1 or offset < 0 or offset > last_offset:
+            return
+        while len(self.rows) < row_number:
+            self.rows.append([])
+        row = self.rows[row_number - 1]
+        while len(row) <= offset:
+            row.append('')
+        if offset == 0 and row_number > 1:
+            old_keyword = row[0].strip() if row[0] else ''
+            if old_keyword in self.index and row_number in self.index[old_keyword]:
+                self.index[old_keyword].remove(row_number)
+                if not self.index[old_keyword]:
+                    del self.index[old_keyword]
+            keyword = value.strip() if value else ''
+            if keyword:
+                self.index.setdefault(keyword, []).append(row_number)
+        row[offset] = value
+
+    def records(self):
+        """헤더를 제외한 (행 번호, 행 값 리스트)를 순서대로 반환."""
+        for i, row in enumerate(self.rows):
+            if i == 0:
+                continue
+            yield i + 1, row
+
+    def date_columns(self):
+        """헤더의 날짜 → 열 문자 딕셔너리 (처음 호출할 때 한 번만 만든다)."""
+        if self._date_columns is None:
+            self._date_columns = build_date_columns(self.header)
+        return self._date_columns
+
+    def find_date_columns(self, dates):
+        """
+        여러 날짜(date 또는 'YYYY-MM-DD')의 열 문자를 한 번에 찾아 {date: 열 문자}로 반환.
+        헤더에 없는 날짜는 결과에서 빠진다.
+        """
+        date_columns = self.date_columns()
+        found = {}
+        for target in dates:
+            if isinstance(target, str):
+                target = datetime.strptime(target, "%Y-%m-%d").date()
+            elif isinstance(target, datetime):
+                target = target.date()
+            if target in date_columns:
+                found[target] = date_columns[target]
+        return found
+
+    def read_column(self, sheets_service, column):
+        """
+        column 열의 지금 값을 서식 없이(숫자는 숫자로) 읽어 {셀(예: I5): 값}으로 반환. 빈 셀은 빠진다.
+        열 위치는 헤더를 읽은 뒤에야 알 수 있어 스냅샷과 별도로 그 열 하나만 읽는다.
+        """
+        values = read_columns(sheets_service, self.spreadsheet_id, [column],
+                              value_render_option="UNFORMATTED_VALUE").get(column, [])
+        return {f"{column}{i + 1}": value for i, value in enumerate(values) if value != ''}
+
+    def find_today_column(self):
+        """
+        1행 헤더에서 오늘 날짜(YYYY-MM-DD / MM/DD / YYYY.MM.DD 형식 포함)를 찾아
+        해당 열의 컬럼 문자(A, B, ..., AA, ..., AAA 등)를 반환.
+        """
+        if not self.header:
+            print("헤더 행을 찾을 수 없습니다.")
+            return None
+
+        today = cassette.now().date()
+        col_letter = self.find_date_columns([today]).get(today)
+        if col_letter:
+            cell_str = str(self.header[column_index(col_letter)]).strip()
+            print(f"오늘 날짜 열 발견: {col_letter}1 ({cell_str})")
+            return col_letter
+
+        print(f"오늘 날짜({today:%Y-%m-%d})에 해당하는 열을 찾을 수 없습니다.")
+        return None
@@ -0,0 +1,121 @@
+"""
+시트 셀 쓰기 버퍼.
+
+키워드 행마다 values().update를 보내는 대신, (행, 열, 값)을 모아 두었다가
+spreadsheets().values().batchUpdate 한 번(또는 몇 번)으로 전송한다.
+set_current로 시트의 지금 값을 알려 주면 값이 같은 셀은 보내지 않는다.
+여러 단계가 스레드로 동시에 add해도 되도록 버퍼 접근은 잠금으로 보호한다.
+"""
+import threading
+
+import run_metrics
+
+# batchUpdate 한 번에 보낼 최대 셀(범위) 수
+BATCH_CHUNK_SIZE = 500
+
+
+def same_value(current, value):
+    """시트에서 읽은 값(UNFORMATTED_VALUE)과 쓸 값이 같은지. 숫자는 1과 1.0, '1'을 같게 본다."""
+    if isinstance(current, (int, float)) or isinstance(value, (int, float)):
+        try:
+            return float(current) == float(value)
+        except (TypeError, ValueError):
+            return False
+    return str(current) == str(value)
+
+
+class SheetWriteBuffer:
+    def __init__(self, sheets_service, spreadsheet_id, chunk_size=BATCH_CHUNK_SIZE):
+        self.sheets_service = sheets_service
+        self.spreadsheet_id = spreadsheet_id
+        self.chunk_size = chunk_size
+        self.pending = []
+        self.current = {}
+        self.lock = threading.Lock()
+
+    def set_current(self, cells):
+        """시트의 지금 값 {셀(예: I5): 값}. flush 때 값이 같은 단일 셀은 건너뛴다."""
+        with self.lock:
+            self.current.update(cells)
+
+    def add(self, label, column, row_number, value):
+        """기록할 셀 하나를 버퍼에 추가."""
+        with self.lock:
+            self.pending.append((label, f"{column}{row_number}", [[value]]))
+
+    def add_range(self, label, cell_range, values):
+        """여러 셀 범위(예: A10:C10)와 2차원 값 리스트를 버퍼에 추가."""
+        with self.lock:
+            self.pending.append((label, cell_range, values))
+
+    def extend(self, other):
+        """다른 버퍼의 셀을 뒤에 이어 붙임. 같은 범위는 flush 때 뒤에 추가된 값이 이긴다."""
+        with other.lock:
+            pending = list(other.pending)
+        with self.lock:
+            self.pending.extend(pending)
+
+    def entries(self):
+        """버퍼에 쌓인 (label, 범위, 2차원 값) 목록의 복사본 (shard 결과 파일용)."""
+        with self.lock:
+            return list(self.pending)
+
+    def __len__(self):
+        return len(self.pending)
+
+    def flush(self):
+        """
+        버퍼에 쌓인 셀을 batchUpdate로 전송하고 (성공 수, 실패 수)를 반환.
+        청크 단위로 전송하며, 실패한 청크의 셀은 모두 실패로 집계한다.
+        """
+        with self.lock:
+            pending, self.pending = self.pending, []
+
+        # 같은 범위에 여러 번 쓴 경우 마지막 값만 전송
+        latest = {}
+        for entry in pending:
+            latest[entry[1]] = entry
+        pending = []
+        skipped = 0
+        for label, cell_range, values in latest.values():
+            single = len(values) == 1 and len(values[0]) == 1
+            if single and cell_range in self.current and same_value(self.current[cell_range], values[0][0]):
+                skipped += 1
+                continue
+            pending.append((label, cell_range, values))
+        if skipped:
+            print(f"값이 같은 셀 {skipped}개는 기록하지 않습니다. (기록 {len(pending)}개)")
+
+        success_count = 0
+        fail_count = 0
+
+        for start in range(0, len(pending), self.chunk_size):
+            chunk = pending[start:start + self.chunk_size]
+            body = {
+                'valueInputOption': 'USER_ENTERED',
+                'data': [
+                    {'range': cell_range, 'values': values}
+                    for _, cell_range, values in chunk
+                ]
+            }
+            try:
+                with run_metrics.timed("sheets", "batchUpdate", f"{self.spreadsheet_id} ({len(chunk)} ranges)") as call:
+                    response = self.sheets_service.spreadsheets().values().batchUpdate(
+                        spreadsheetId=self.spreadsheet_id,
+                        body=body
+                    ).execute()
+                    call.set_response(response)
+            except Exception as e:
+                for label, cell_range, _ in chunk:
+                    print(f"✗ '{label}' 기록 실패 ({cell_range}): {e}")
+                fail_count += len(chunk)
+                continue
+
+            for label, cell_range, values in chunk:
+                value = values[0][0] if len(values) == 1 and len(values[0]) == 1 else values
+                print(f"✓ '{label}': {value} → {cell_range}")
+                if value is not values:
+                    self.current[cell_range] = value
+            success_count += len(chunk)
+
+        return success_count, fail_count
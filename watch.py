@@ -0,0 +1,269 @@
+"""
+실시간 watch 모드.
+
+주간 누적값(시작할 때 한 번 계산한 기준값)에 runRealtimeReport로 받은 watch 시작 이후 클릭 수를 더해
+--interval초마다 시트의 오늘 날짜 열(또는 --column)을 갱신한다. PR을 올리는 날 당일 숫자를 볼 때 쓴다.
+
+  - 실시간 리포트는 최근 30분을 (값, minutesAgo)로 나눠 돌려주므로, 분 단위로 최신 값만 들고 있다가
+    30분 창을 벗어난 분은 확정 합계로 넘긴다. 메모리는 (창 30분 + 키 수)만큼만 쓴다.
+  - 값이 바뀐 셀만 시트마다 batchUpdate 한 번으로 기록한다. 바뀐 셀이 없으면 쓰지 않는다.
+  - 요청은 property별 QuotaLimiter를 거치고, 주기마다 보낼 요청 수로 시간당 토큰 한도를 넘을 것 같으면
+    시작할 때 주기를 늘린다.
+  - 날짜가 바뀌면 기준값과 실시간 누적을 새로 계산한다.
+기준값은 GA 표준 리포트 처리 지연만큼 최근 몇 시간이 빠져 있을 수 있고, 다음 주간 실행이 정확한 누적값으로 덮어쓴다.
+작업 목록은 job_engine과 같은 설정 파일(jobs.json)을 쓰며, 작업의 dimension은 실시간 리포트에서 지원해야 한다.
+
+사용 예:
+  python watch.py --jobs cafe24pro_source,cafe24pro_campaign --interval 300
+  python watch.py --column K --iterations 1
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+import report_cache
+import run_metrics
+from ga_client import get_sheets_service
+from ga_executor import TOKENS_PER_HOUR, QuotaLimiter
+from ga_reports import REALTIME_MINUTES, realtime_click_report_body, run_realtime_report
+from job_engine import DEFAULT_CONFIG_PATH, job_keys, job_totals, load_config, snapshot_columns
+from sheet_snapshot import SheetSnapshot, read_columns
+from sheet_writer import SheetWriteBuffer
+
+WATCH_INTERVAL = int(os.getenv("GA_WATCH_INTERVAL", "300"))
+
+# 주기 하한(초). 실시간 리포트도 분 단위라 이보다 자주 물어도 값이 거의 같다.
+MIN_INTERVAL = 60
+
+
+class RealtimeCounter:
+    """
+    runRealtimeReport(분 단위) 결과를 started_minute 이후 누적 클릭 수로 합치는 카운터.
+    최근 REALTIME_MINUTES분은 분마다 마지막으로 받은 값을 들고 있고, 창을 벗어난 분은 settled에 더한다.
+    """
+
+    def __init__(self, started_minute, window=REALTIME_MINUTES):
+        self.started_minute = started_minute
+        self.window = window
+        self.minutes = {}
+        self.settled = {}
+
+    def update(self, rows, now_minute):
+        """rows: (소문자 값, minutesAgo, 클릭 수). now_minute: 응답 시각의 epoch 분."""
+        fresh = {}
+        for value, minutes_ago, clicks in rows:
+            minute = now_minute - minutes_ago
+            if minute < self.started_minute:
+                continue
+            counts = fresh.setdefault(minute, {})
+            counts[value] = counts.get(value, 0) + clicks
+
+        oldest = now_minute - self.window + 1
+        for minute in [m for m in self.minutes if m < oldest]:
+            for value, clicks in self.minutes.pop(minute).items():
+                self.settled[value] = self.settled.get(value, 0) + clicks
+        for minute, counts in fresh.items():
+            if minute >= oldest:
+                self.minutes[minute] = counts
+
+    def totals(self):
+        totals = dict(self.settled)
+        for counts in self.minutes.values():
+            for value, clicks in counts.items():
+                totals[value] = totals.get(value, 0) + clicks
+        return totals
+
+
+def realtime_rows(response):
+    for row in response.get('rows', []):
+        yield (
+            row['dimensionValues'][0]['value'].lower(),
+            int(row['dimensionValues'][1]['value']),
+            int(row['metricValues'][0]['value']),
+        )
+
+
+class WatchedJob:
+    def __init__(self, job, column, keys, baseline, started_minute):
+        self.job = job
+        self.column = column
+        self.keys = keys
+        self.baseline = baseline
+        self.counter = RealtimeCounter(started_minute)
+        self.body = realtime_click_report_body(
+            job["dimension"], values=[key for _, key, _ in keys],
+            extra_filters=job.get("filters"), event_name=job["event_name"]
+        )
+
+    def cells(self):
+        """{셀: (출력용 값, 누적 클릭 수)}"""
+        live = self.counter.totals()
+        offsets = self.job.get("offsets", {})
+        cells = {}
+        for row_number, key, label in self.keys:
+            value = self.baseline.get(key.lower(), 0) + live.get(key.lower(), 0) + offsets.get(key, 0)
+            cells[f"{self.column}{row_number}"] = (label, value)
+        return cells
+
+
+def start_jobs(jobs, sheets_service, column, options):
+    """작업마다 시트를 읽고 기준 누적값을 계산해서 WatchedJob 목록을 반환 (오늘 열이 없는 작업은 제외)."""
+    end_date = datetime.now().strftime("%Y-%m-%d")
+    started_minute = int(time.time() // 60)
+    watched = []
+    for job in jobs:
+        with run_metrics.tagged(stage=job["name"]):
+            print(f"\n[{job['name']}] 기준 누적값 계산")
+            snapshot = SheetSnapshot.load(sheets_service, job["sheet_id"], snapshot_columns(job))
+            job_column = column or snapshot.find_today_column()
+            if not job_column:
+                print(f"[{job['name']}] 기록할 열이 없어 제외합니다.")
+                continue
+            keys = job_keys(job, snapshot)
+            baseline = job_totals(job, keys, end_date, options)
+            watched.append(WatchedJob(job, job_column, keys, baseline, started_minute))
+    return watched
+
+
+def sheet_writers(sheets_service, watched):
+    """
+    시트마다 SheetWriteBuffer를 만들고 지금 적힌 값(UNFORMATTED_VALUE)을 set_current로 알려 준다.
+    시작할 때와 날짜가 바뀔 때 한 번만 읽고, 이후에는 flush가 기록한 값으로 갱신된다.
+    """
+    columns_by_sheet = {}
+    for item in watched:
+        columns_by_sheet.setdefault(item.job["sheet_id"], set()).add(item.column)
+    writers = {}
+    for sheet_id, letters in columns_by_sheet.items():
+        writer = SheetWriteBuffer(sheets_service, sheet_id)
+        for letter, values in read_columns(sheets_service, sheet_id, sorted(letters),
+                                           value_render_option="UNFORMATTED_VALUE").items():
+            writer.set_current({f"{letter}{i + 1}": value for i, value in enumerate(values) if value != ''})
+        writers[sheet_id] = writer
+    return writers
+
+
+def check_interval(interval, watched, limiters):
+    """property별 주기당 요청 수로 시간당 토큰 한도를 넘지 않는 가장 짧은 주기를 반환."""
+    requests_per_property = {}
+    for item in watched:
+        property_id = item.job["property_id"]
+        requests_per_property[property_id] = requests_per_property.get(property_id, 0) + 1
+    needed = MIN_INTERVAL
+    for property_id, count in requests_per_property.items():
+        limiter = limiters[property_id]
+        needed = max(needed, count * limiter.cost * 3600 / limiter.capacity)
+    if interval < needed:
+        print(f"시간당 토큰 한도에 맞춰 주기를 {interval}초 → {needed:.0f}초로 늘립니다.")
+        return needed
+    return interval
+
+
+def poll(watched, limiters):
+    """작업마다 실시간 리포트를 받아 카운터를 갱신. 같은 요청은 주기당 한 번만 보낸다."""
+    responses = {}
+    for item in watched:
+        property_id = item.job["property_id"]
+        key = report_cache.cache_key(property_id, item.body)
+        with run_metrics.tagged(stage=item.job["name"]):
+            try:
+                if key not in responses:
+                    responses[key] = (run_realtime_report(property_id, item.body, limiter=limiters[property_id]),
+                                      int(time.time() // 60))
+            except Exception as e:
+                print(f"[{item.job['name']}] 실시간 리포트 조회 중 오류: {e}")
+                continue
+        response, now_minute = responses[key]
+        item.counter.update(realtime_rows(response), now_minute)
+
+
+def write_changes(watched, writers):
+    """값이 바뀐 셀만 시트마다 batchUpdate 한 번으로 기록하고 (성공 수, 실패 수)를 반환."""
+    for item in watched:
+        for cell, (label, value) in item.cells().items():
+            # 같은 셀에 여러 작업이 쓰면 설정 순서상 뒤 작업 값 (flush가 마지막 값만 보냄)
+            writers[item.job["sheet_id"]].add_range(label, cell, [[value]])
+
+    success_count = 0
+    fail_count = 0
+    for writer in writers.values():
+        succeeded, failed = writer.flush()
+        success_count += succeeded
+        fail_count += failed
+    return success_count, fail_count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="실시간 리포트로 오늘 클릭 수를 주기적으로 시트에 반영")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help=f"작업 설정 파일 (기본 {DEFAULT_CONFIG_PATH})")
+    parser.add_argument("--jobs", help="실행할 작업 이름 (쉼표 구분, 기본: 전체)")
+    parser.add_argument("--interval", type=int, default=WATCH_INTERVAL,
+                        help=f"갱신 주기(초, 기본 {WATCH_INTERVAL}, 최소 {MIN_INTERVAL})")
+    parser.add_argument("--column", help="기록할 열 문자 (기본: 오늘 날짜 열)")
+    parser.add_argument("--iterations", type=int, default=0, help="이 횟수만큼 갱신하고 종료 (0이면 계속)")
+    parser.add_argument("--no-incremental", action="store_true",
+                        help="기준값을 로컬 저장소 없이 전체 기간을 GA에서 직접 조회")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    jobs, properties = load_config(args.config)
+    if args.jobs:
+        selected = {name.strip() for name in args.jobs.split(",") if name.strip()}
+        jobs = [job for job in jobs if job["name"] in selected]
+    if not jobs:
+        print("실행할 작업이 없습니다.")
+        exit(1)
+
+    options = {"incremental": not args.no_incremental, "full_rebuild": False}
+    limiters = {
+        job["property_id"]: QuotaLimiter(
+            tokens_per_hour=properties.get(job["property_id"], {}).get("tokens_per_hour", TOKENS_PER_HOUR)
+        )
+        for job in jobs
+    }
+
+    sheets_service = get_sheets_service()
+    watched = start_jobs(jobs, sheets_service, args.column, options)
+    if not watched:
+        print("기록할 열을 찾은 작업이 없어 종료합니다.")
+        exit(1)
+    writers = sheet_writers(sheets_service, watched)
+    interval = check_interval(max(args.interval, MIN_INTERVAL), watched, limiters)
+    today = datetime.now().date()
+    print(f"\nwatch 시작: 작업 {len(watched)}개, {interval:.0f}초마다 갱신 (Ctrl+C로 종료)")
+
+    iteration = 0
+    try:
+        while True:
+            started = time.monotonic()
+            if datetime.now().date() != today:
+                print("\n날짜가 바뀌어 기준값을 다시 계산합니다.")
+                today = datetime.now().date()
+                watched = start_jobs(jobs, sheets_service, args.column, options) or watched
+                writers = sheet_writers(sheets_service, watched)
+
+            poll(watched, limiters)
+            success_count, fail_count = write_changes(watched, writers)
+            print(f"[{datetime.now():%H:%M:%S}] 바뀐 셀 {success_count}개 기록 (실패 {fail_count}개)")
+
+            # 주기마다 요약을 갱신하고 호출 기록은 비워서 오래 돌아도 메모리가 늘지 않게 함
+            try:
+                run_metrics.write_reports("watch")
+            except OSError as e:
+                print(f"실행 요약 기록 실패: {e}")
+            run_metrics.reset()
+
+            iteration += 1
+            if args.iterations and iteration >= args.iterations:
+                break
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print("\nwatch 종료")
+
+
+if __name__ == "__main__":
+    main()